@@ -1,11 +1,16 @@
-from display.display import EInkDisplay
+from display.display_service import DisplayClient
 from PIL import Image
 
 
 if __name__ == "__main__":
-    eInkDisplay = EInkDisplay(984, 1304)
-
     black_image = Image.new("1", (1304, 984), 255)
     red_image = Image.new("1", (1304, 984), 255)
-    eInkDisplay.display(black_image, red_image)
 
+    display_client = DisplayClient()
+    if display_client.is_available():
+        display_client.display(black_image, red_image, force=True)
+    else:
+        from display.display import EInkDisplay
+
+        eInkDisplay = EInkDisplay(984, 1304)
+        eInkDisplay.display(black_image, red_image, force=True)
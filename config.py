@@ -1,4 +1,4 @@
-from typing import Any, List, Literal, TypedDict
+from typing import Any, List, Literal, Optional, TypedDict
 import pytz
 
 
@@ -20,3 +20,18 @@ class Config(TypedDict):
     screenWidth: int
     thresholdHours: int
     alarm_interval_minutes: int
+    debugImageDir: Optional[str]  # Writes calendar/black/red PNGs here when set
+    persistentBrowser: bool  # Keeps headless Chromium running between renders
+    renderBackend: Literal['browser', 'pillow']
+    renderCacheDir: str
+    renderCacheMaxBytes: int
+    busyTimeoutSeconds: float  # Raises if the panel controllers stay busy longer
+    displayStatePath: str  # Digest of the frame on the panel, unchanged frames skip the refresh
+    fastRefreshBudget: int  # Fast black-only updates between full refreshes, 0 disables them
+    displaySocketPath: str  # Unix socket of the display service, used instead of driving the panel when it runs
+    framebufferPath: str  # Memory mapped file the rendered planes are published in
+    httpCacheDir: str
+    httpCacheTtlSeconds: float  # Apps Script payloads younger than this are used without a request
+    fetchBudgetSeconds: float  # Upper bound for fetching the Apps Script payload, including retries
+    fetchReadTimeoutSeconds: float
+    fetchRetries: int
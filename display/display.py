@@ -4,40 +4,141 @@
 This part of the code exposes functions to interface with the eink display
 """
 
+import datetime as dt
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
 import display.lib_epd12in48b as eink
+from display import epd_buffer
 from PIL import Image
 import logging
 
+# Digest of the frame on the panel, kept next to config.json
+DEFAULT_STATE_PATH = 'display_state.json'
+
 
 class EInkDisplay:
 
-    def __init__(self, width: int, height: int) -> None:
-        # Initialise the display
+    def __init__(self, width: int, height: int, busy_timeout: float = eink.BUSY_TIMEOUT_S,
+                 state_path: str = DEFAULT_STATE_PATH, fast_refresh_budget: int = 0) -> None:
+        # The controllers are only initialised once something is sent, skipped frames never wake them.
+        # fast_refresh_budget: fast black-only updates allowed per controller between its full refreshes,
+        # 0 disables them
         self.logger = logging.getLogger('maginkcal')
         self.screenwidth = width
         self.screenheight = height
-        self.epd = eink.EPD()
-        self.epd.Init()
+        self.state_path = state_path
+        self.fast_refresh_budget = fast_refresh_budget
+        self.epd = eink.EPD(busy_timeout)
+        self.initialized = False
+        self.fast_updates = self.load_fast_updates()
+
+    def init(self):
+        if not self.initialized:
+            self.epd.Init()
+            # Lets the driver skip controllers whose region is unchanged since the last run
+            self.epd.region_digests = dict(self.get_state().get('regions', {}))
+            self.initialized = True
+
+    def display(self, black_image: Image.Image, red_image: Image.Image, force: bool = False) -> bool:
+        # Updates the display with the grayscale and red images, unless the panel already shows them.
+        # Returns whether the panel was refreshed.
+        black_buf, red_buf = epd_buffer.pack_planes(black_image, red_image, self.epd.width, self.epd.height)
+        return self.display_buffers(black_buf, red_buf, force)
+
+    def display_buffers(self, black_buf: bytes, red_buf: bytes, force: bool = False) -> bool:
+        # Same as display for planes already packed by epd_buffer.pack_planes
+        frame_digest = self.get_frame_digest(black_buf, red_buf)
+        if not force and frame_digest == self.get_state().get('frame'):
+            self.logger.info('E-Ink display already shows this frame, skipping refresh.')
+            return False
 
-    def display(self, black_image: Image.Image, red_image: Image.Image):
-        # Updates the display with the grayscale and red images
-        # start displaying on eink display
-        # self.epd.clear()
-        self.epd.display(black_image, red_image)
-        self.logger.info('Showing image on E-Ink display.')
+        fast = self.fast_refresh_budget > 0 and not force
+        if fast:
+            # Controllers that used up their ghosting budget get a full refresh, which clears what the fast updates left
+            exhausted = [name for name, count in self.fast_updates.items() if count >= self.fast_refresh_budget]
+            if exhausted:
+                self.logger.info(f'{", ".join(exhausted)} reached {self.fast_refresh_budget} fast updates since their '
+                                 'last full refresh, running a full refresh.')
+                force = exhausted
+
+        self.init()
+        try:
+            mode, refreshed = self.epd.display_buffers(black_buf, red_buf, force, fast)
+        except Exception:
+            # Whatever the panel shows now is unknown, the next frame must not be skipped.
+            # The driver already dropped the regions that failed.
+            self.set_shown_digest(None)
+            raise
+        # Only the refreshed controllers move, a full refresh elsewhere does not clear this one's ghosting
+        for name in refreshed:
+            self.fast_updates[name] = self.fast_updates.get(name, 0) + 1 if mode == 'fast' else 0
+        self.set_shown_digest(frame_digest)
+        self.logger.info(f'Showing image on E-Ink display ({mode} refresh).')
+        return True
 
     def calibrate(self, cycles=1):
         # Calibrates the display to prevent ghosting
+        self.init()
         white = Image.new('1', (self.screenwidth, self.screenheight), 'white')
         black = Image.new('1', (self.screenwidth, self.screenheight), 'black')
+        # Packed once, every cycle uploads the same three frames
+        frames = [epd_buffer.pack_planes(black_image, red_image, self.epd.width, self.epd.height)
+                  for black_image, red_image in ((black, white), (white, black), (white, white))]
         for _ in range(cycles):
-            self.epd.display(black, white)
-            self.epd.display(white, black)
-            self.epd.display(white, white)
+            for black_buf, red_buf in frames:
+                self.epd.display_buffers(black_buf, red_buf, force=True)
+        # The panel ends up white, the driver tracked the regions of the last calibration frame
+        self.fast_updates = {}
+        self.set_shown_digest(None)
         self.logger.info('E-Ink display calibration complete.')
 
     def sleep(self):
         # send E-Ink display to deep sleep
+        if not self.initialized:
+            return
         self.epd.EPD_Sleep()
+        self.initialized = False
         self.logger.info('E-Ink display entered deep sleep.')
 
+    def get_frame_digest(self, black_buf: bytes, red_buf: bytes) -> str:
+        sha = hashlib.sha256(black_buf)
+        sha.update(red_buf)
+        return sha.hexdigest()
+
+    def get_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def load_fast_updates(self) -> Dict[str, int]:
+        # Fast updates per controller since its last full refresh
+        fast_updates = self.get_state().get('fast_updates', {})
+        if not isinstance(fast_updates, dict):
+            # Older state files kept a single count for the whole panel
+            return {name: fast_updates for name, _, _ in eink.CONTROLLER_REGIONS}
+        return fast_updates
+
+    def set_shown_digest(self, frame_digest: Optional[str]) -> None:
+        # Written atomically, an interrupted update must not leave a digest for a frame that is not shown
+        state = {
+            'frame': frame_digest,
+            'regions': self.epd.region_digests,
+            'fast_updates': self.fast_updates,
+            'displayed': dt.datetime.now().isoformat(),
+        }
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.display_state-')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(state, file)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.logger.warning(f'Failed to record the displayed frame in {self.state_path}: {e}')
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resident display service that owns the GPIO/SPI state of the e-Paper panel.
+
+The panel is initialised once when the service starts; renderers and scripts submit packed frames over a local
+Unix socket with DisplayClient, the socket is only accessible to the user running the service. The service keeps
+the next frame to show in a back buffer, the panel itself holds the shown one. A newer frame replaces a pending one
+that has not been started yet, so bursts of submissions coalesce into a single refresh.
+
+Wire format, one request per connection: a JSON header line, followed by the black and red planes for 'display'
+(header fields black_len and red_len). 'framebuffer' sends no planes, the service maps the framebuffer file named
+in the header (see display/framebuffer.py) and shows its latest frame; only the configured framebufferPath is
+accepted. The reply is a single JSON line.
+
+Run with `python -m display.display_service`, settings are read from config.json.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from display import epd_buffer
+from display.framebuffer import DEFAULT_FRAMEBUFFER_PATH, FrameBufferReader
+
+DEFAULT_SOCKET_PATH = '/tmp/inkal-display.sock'
+
+# lib_epd12in48b.EPD_WIDTH / EPD_HEIGHT, clients must not import the GPIO driver
+PANEL_WIDTH = 1304
+PANEL_HEIGHT = 984
+
+OPS = ('display', 'framebuffer', 'calibrate', 'status')
+
+
+class DisplayServiceError(Exception):
+    """
+    Raised by DisplayClient when the service rejects or fails a request
+    """
+
+
+class Job:
+    """
+    One submitted request, finished once the worker ran it or a newer frame replaced it
+    """
+
+    def __init__(self, op: str, header: Dict[str, Any], planes: Optional[Tuple[bytes, bytes]] = None):
+        self.op = op
+        self.header = header
+        self.planes = planes
+        self.result: Dict[str, Any] = {}
+        self.done = threading.Event()
+
+    def finish(self, **result: Any) -> None:
+        self.result = result
+        self.done.set()
+
+
+class DisplayService:
+    """
+    Serialises all panel access through one worker thread fed by the socket server
+    """
+
+    def __init__(self, eink_display, socket_path: str = DEFAULT_SOCKET_PATH,
+                 framebuffer_path: str = DEFAULT_FRAMEBUFFER_PATH):
+        self.logger = logging.getLogger('maginkcal')
+        self.eink_display = eink_display
+        self.socket_path = socket_path
+        self.framebuffer_path = os.path.realpath(framebuffer_path)
+        self.back: Optional[Job] = None
+        self.jobs: List[Job] = []
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self.threads: List[threading.Thread] = []
+        self.reader: Optional[FrameBufferReader] = None
+
+    def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                service.handle(self.rfile, self.wfile)
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        # Any local user could otherwise drive the panel
+        os.chmod(self.socket_path, 0o600)
+        self.server.daemon_threads = True
+        self.eink_display.init()
+        self.threads = [
+            threading.Thread(target=self.server.serve_forever, name='display-server', daemon=True),
+            threading.Thread(target=self.work, name='display-worker', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        self.logger.info(f'Display service listening on {self.socket_path}.')
+
+    def stop(self) -> None:
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for thread in self.threads:
+            thread.join()
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def serve_forever(self) -> None:
+        self.start()
+        try:
+            for thread in self.threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stop()
+
+    def handle(self, rfile, wfile) -> None:
+        try:
+            header = json.loads(rfile.readline())
+            op = header.get('op')
+            if op not in OPS:
+                raise ValueError(f'Unknown operation {op!r}')
+            if op == 'framebuffer' and os.path.realpath(header['path']) != self.framebuffer_path:
+                raise ValueError(f'Only the framebuffer {self.framebuffer_path} is shown')
+            if op == 'status':
+                result = {'ok': True, 'frame': self.eink_display.get_state().get('frame'),
+                          'pending': len(self.jobs)}
+            else:
+                planes = self.read_planes(rfile, header) if op == 'display' else None
+                job = self.submit(Job(op, header, planes))
+                job.done.wait()
+                result = job.result
+        except (ValueError, KeyError) as e:
+            result = {'ok': False, 'error': str(e)}
+        wfile.write(json.dumps(result).encode() + b'\n')
+
+    def read_planes(self, rfile, header: Dict[str, Any]) -> Tuple[bytes, bytes]:
+        plane_bytes = PANEL_WIDTH * PANEL_HEIGHT // 8
+        if header['black_len'] != plane_bytes or header['red_len'] != plane_bytes:
+            raise ValueError(f'Planes must be {plane_bytes} bytes each')
+        black = rfile.read(plane_bytes)
+        red = rfile.read(plane_bytes)
+        if len(black) != plane_bytes or len(red) != plane_bytes:
+            raise ValueError('Connection closed before the planes were complete')
+        return black, red
+
+    def submit(self, job: Job) -> Job:
+        with self.condition:
+            if job.op in ('display', 'framebuffer'):
+                # The back buffer only ever holds the newest frame
+                if self.back is not None:
+                    self.jobs.remove(self.back)
+                    self.back.finish(ok=True, refreshed=False, superseded=True)
+                self.back = job
+            self.jobs.append(job)
+            self.condition.notify()
+        return job
+
+    def work(self) -> None:
+        while True:
+            with self.condition:
+                while not self.jobs and not self.stopping:
+                    self.condition.wait()
+                if self.stopping:
+                    for job in self.jobs:
+                        job.finish(ok=False, error='Display service stopped')
+                    return
+                job = self.jobs.pop(0)
+                if job is self.back:
+                    self.back = None
+
+            try:
+                if job.op == 'display':
+                    refreshed = self.eink_display.display_buffers(*job.planes, job.header.get('force', False))
+                    job.finish(ok=True, refreshed=refreshed)
+                elif job.op == 'framebuffer':
+                    refreshed = self.show_framebuffer(job.header.get('force', False))
+                    job.finish(ok=True, refreshed=refreshed)
+                else:
+                    self.eink_display.calibrate(job.header.get('cycles', 1))
+                    job.finish(ok=True, refreshed=True)
+            except Exception as e:
+                self.logger.error(f'Display service failed to {job.op}: {e}')
+                job.finish(ok=False, error=str(e))
+
+    def show_framebuffer(self, force: bool) -> bool:
+        """
+        Uploads the latest frame straight from the mapped file, again if the renderer replaced it meanwhile
+        """
+        if self.reader is None:
+            self.reader = FrameBufferReader(self.framebuffer_path)
+        reader = self.reader
+        refreshed = False
+        while True:
+            seq, black, red = reader.read()
+            refreshed = self.eink_display.display_buffers(black, red, force) or refreshed
+            del black, red
+            if reader.is_unchanged(seq):
+                return refreshed
+            self.logger.info('Framebuffer was rewritten during the upload, showing the new frame.')
+
+
+class DisplayClient:
+    """
+    Submits frames to a running DisplayService
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def is_available(self) -> bool:
+        try:
+            self.request({'op': 'status'})
+            return True
+        except (OSError, DisplayServiceError):
+            return False
+
+    def display(self, black_image: Image.Image, red_image: Image.Image, force: bool = False) -> bool:
+        """
+        Packs the planes and waits until the service showed them, returns whether the panel was refreshed
+        """
+        black_buf, red_buf = epd_buffer.pack_planes(black_image, red_image, PANEL_WIDTH, PANEL_HEIGHT)
+        return self.display_buffers(black_buf, red_buf, force)
+
+    def display_buffers(self, black_buf: bytes, red_buf: bytes, force: bool = False) -> bool:
+        header = {'op': 'display', 'force': force, 'black_len': len(black_buf), 'red_len': len(red_buf)}
+        return self.request(header, black_buf + red_buf)['refreshed']
+
+    def display_framebuffer(self, path: str, force: bool = False) -> bool:
+        """
+        Asks the service to show the frame last written to a framebuffer file, no planes are sent
+        """
+        return self.request({'op': 'framebuffer', 'path': os.path.abspath(path), 'force': force})['refreshed']
+
+    def calibrate(self, cycles: int = 1) -> None:
+        self.request({'op': 'calibrate', 'cycles': cycles})
+
+    def request(self, header: Dict[str, Any], payload: bytes = b'') -> Dict[str, Any]:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps(header).encode() + b'\n' + payload)
+            with sock.makefile('rb') as response:
+                line = response.readline()
+        if not line:
+            raise DisplayServiceError('Display service closed the connection')
+        result = json.loads(line)
+        if not result.get('ok'):
+            raise DisplayServiceError(result.get('error', 'unknown error'))
+        return result
+
+
+def main():
+    from display.display import DEFAULT_STATE_PATH, EInkDisplay
+
+    with open('config.json') as configFile:
+        config = json.load(configFile)
+
+    logging.basicConfig(level=logging.INFO)
+    eink_display = EInkDisplay(
+        config['screenWidth'],
+        config['screenHeight'],
+        config.get('busyTimeoutSeconds', 60),
+        config.get('displayStatePath', DEFAULT_STATE_PATH),
+        config.get('fastRefreshBudget', 0),
+    )
+    DisplayService(
+        eink_display,
+        config.get('displaySocketPath', DEFAULT_SOCKET_PATH),
+        config.get('framebufferPath', DEFAULT_FRAMEBUFFER_PATH),
+    ).serve_forever()
+
+
+if __name__ == '__main__':
+    main()
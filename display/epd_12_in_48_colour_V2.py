@@ -30,6 +30,7 @@ THE SOFTWARE.
 import time
 
 from display.epdconfig_12_in_48 import epdconfig_12_in_48 as epdconfig
+from display import epd_buffer
 
 EPD_WIDTH = 1304
 EPD_HEIGHT = 984
@@ -128,26 +129,7 @@ class EPD(object):
         self.SetLut()
 
     def getbuffer(self, image):
-        # logging.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 8) * self.height)
-        image_monocolor = image.convert('1')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-
-        if (imwidth == self.width and imheight == self.height):
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if pixels[x, y] == 0:
-                        buf[int((x + y * self.width) / 8)] &= ~(0x80 >> (x % 8))
-        elif (imwidth == self.height and imheight == self.width):
-            for y in range(imheight):
-                for x in range(imwidth):
-                    newx = y
-                    newy = self.height - x - 1
-                    if pixels[x, y] == 0:
-                        buf[int((newx + newy * self.width) / 8)] &= ~(0x80 >> (y % 8))
-        return buf
+        return epd_buffer.pack_plane(image, self.width, self.height)
 
     def display(self, blackbuf, redbuf):
 
@@ -0,0 +1,95 @@
+"""
+Packs PIL images into the 1 bit per pixel frame buffers the 12.48" e-Paper controllers expect.
+
+Pixels are packed row by row, MSB first, a set bit is white. Images in portrait orientation (width and height
+swapped) are rotated by 90 degrees onto the landscape panel, like the per-pixel loops in the Waveshare drivers,
+other orientations are selected with the rotate argument.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+def pack_plane(image: Image.Image, width: int, height: int, rotate: Optional[int] = None) -> bytes:
+    """
+    Thresholds an image to 1 bit and packs it into a width * height / 8 byte buffer.
+    rotate turns the image counter-clockwise by 0, 90, 180 or 270 degrees onto the panel (like Image.rotate with
+    expand). By default portrait images are turned by 90 degrees and landscape images are packed as they are.
+    """
+    # convert('1') dithers to 0/255, numpy exposes 1 bit images as bool arrays (True = white)
+    pixels = np.asarray(image.convert('1'))
+
+    if rotate is None:
+        rotate = 90 if pixels.shape == (width, height) and width != height else 0
+    rotate %= 360
+    expected = (height, width) if rotate in (0, 180) else (width, height)
+    if pixels.shape != expected or width % 8:
+        raise ValueError(
+            f'Image size {image.size} does not fit the {width}x{height} panel rotated by {rotate} degrees'
+        )
+
+    # Rotation is folded into packbits: the image is packed along the axis that becomes a panel row and only the
+    # packed result (1/8 of the image) is flipped or transposed, with little bit order where that axis runs backwards
+    if rotate == 0:
+        packed = np.packbits(pixels, axis=1)
+    elif rotate == 90:
+        packed = pack_rows(pixels, 'big').T[::-1]
+    elif rotate == 180:
+        packed = np.packbits(pixels, axis=1, bitorder='little')[::-1, ::-1]
+    elif rotate == 270:
+        packed = pack_rows(pixels, 'little')[::-1].T
+    else:
+        raise ValueError(f'Rotation must be a multiple of 90 degrees, got {rotate}')
+    return packed.tobytes()
+
+
+def pack_rows(pixels: np.ndarray, bitorder: str) -> np.ndarray:
+    """
+    np.packbits(pixels, axis=0) for bool images with a multiple of 8 rows. Combines whole rows with shifts instead
+    of walking the image column by column, which makes a portrait frame pack about as fast as a landscape one.
+    """
+    # Pillow stores True as 0xff, numpy as 0x01, the lowest bit is set either way
+    rows = pixels.view(np.uint8).reshape(-1, 8, pixels.shape[1])
+    packed = np.zeros((rows.shape[0], rows.shape[2]), dtype=np.uint8)
+    for bit in range(8):
+        packed |= (rows[:, bit] & 1) << (7 - bit if bitorder == 'big' else bit)
+    return packed
+
+
+def pack_planes(black_image: Image.Image, red_image: Image.Image, width: int, height: int,
+                rotate: Optional[int] = None) -> Tuple[bytes, bytes]:
+    """
+    Packs the black and red planes concurrently, the numpy and Pillow work releases the GIL
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        black = executor.submit(pack_plane, black_image, width, height, rotate)
+        red = executor.submit(pack_plane, red_image, width, height, rotate)
+        return black.result(), red.result()
+
+
+def get_panel_rotation(rotate_angle: int, screen_width: int, screen_height: int, width: int, height: int) -> int:
+    """
+    Combines config.json's rotateAngle (rendered image -> screen) with turning a portrait screen onto the
+    landscape panel, so both happen in one pack_plane pass
+    """
+    portrait = (screen_width, screen_height) == (height, width) and width != height
+    return (rotate_angle + (90 if portrait else 0)) % 360
+
+
+def invert(buf: bytes) -> bytes:
+    """
+    Flips every bit, the controllers' red RAM uses 1 for red while the packed plane uses 0
+    """
+    return np.invert(np.frombuffer(buf, dtype=np.uint8)).tobytes()
+
+
+def region(buf: bytes, width: int, rows: Tuple[int, int], cols: Tuple[int, int]) -> bytes:
+    """
+    Cuts one controller's window out of a packed plane as a contiguous buffer.
+    rows are pixel rows, cols are byte columns (8 pixels each), both as [start, end).
+    """
+    plane = np.frombuffer(buf, dtype=np.uint8).reshape(-1, width // 8)
+    return plane[rows[0]:rows[1], cols[0]:cols[1]].tobytes()
@@ -0,0 +1,150 @@
+"""
+Simulated hardware backend for the 12.48" e-Paper drivers, selected with INKAL_EPD_BACKEND=simulated.
+
+Implements the same functions as the RaspberryPi backend in epdconfig_12_in_48.py without touching GPIO or SPI.
+Every byte is recorded per chip-select as command / data transactions, BUSY goes low for refresh_s after a
+refresh command, and the panel contents can be rebuilt from the last frame written to each controller's RAM.
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+from PIL import Image
+
+# Seconds a controller keeps BUSY low after a refresh (0x12), the real panel takes tens of seconds
+REFRESH_S = 0.05
+
+DATA_START_TRANSMISSION_1 = 0x10
+DATA_START_TRANSMISSION_2 = 0x13
+DISPLAY_REFRESH = 0x12
+
+class SimulatedPanel:
+    def __init__(self, width: int = 1304, height: int = 984, refresh_s: float = REFRESH_S):
+        import display.epdconfig_12_in_48 as epdconfig
+
+        self.width = width
+        self.height = height
+        self.refresh_s = refresh_s
+        self.lock = threading.Lock()
+
+        # chip select pin -> (controller, data/command pin, busy pin)
+        self.chips: Dict[int, Tuple[str, int, int]] = {
+            epdconfig.EPD_M1_CS_PIN: ('M1', epdconfig.EPD_M1S1_DC_PIN, epdconfig.EPD_M1_BUSY_PIN),
+            epdconfig.EPD_S1_CS_PIN: ('S1', epdconfig.EPD_M1S1_DC_PIN, epdconfig.EPD_S1_BUSY_PIN),
+            epdconfig.EPD_M2_CS_PIN: ('M2', epdconfig.EPD_M2S2_DC_PIN, epdconfig.EPD_M2_BUSY_PIN),
+            epdconfig.EPD_S2_CS_PIN: ('S2', epdconfig.EPD_M2S2_DC_PIN, epdconfig.EPD_S2_BUSY_PIN),
+        }
+        self.busy_pins = {busy: name for name, _, busy in self.chips.values()}
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forgets all recorded traffic and statistics, pins go back to their idle levels
+        """
+        self.pins: Dict[int, int] = {cs: 1 for cs in self.chips}
+        self.stats: Counter = Counter()
+        # controller -> [(command, data), ...] in the order they were sent
+        self.transactions: Dict[str, List[Tuple[int, bytearray]]] = {name: [] for name, _, _ in self.chips.values()}
+        self.busy_until: Dict[str, float] = {name: 0.0 for name in self.transactions}
+
+    def digital_write(self, pin, value):
+        self.stats['digital_write'] += 1
+        self.pins[pin] = 1 if value else 0
+
+    def digital_read(self, pin):
+        self.stats['digital_read'] += 1
+        name = self.busy_pins.get(pin)
+        if name is not None:
+            return 0 if time.monotonic() < self.busy_until[name] else 1
+        return self.pins.get(pin, 0)
+
+    def wait_for_high(self, pins, is_high, timeout):
+        """Same contract as the hardware backend, sleeps until the next modelled BUSY release"""
+        remaining = set(pins)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = {pin for pin in remaining if not is_high(pin)}
+            now = time.monotonic()
+            if not remaining or now >= deadline:
+                return remaining
+            release = min((self.busy_until[self.busy_pins[pin]] for pin in remaining if pin in self.busy_pins),
+                          default=deadline)
+            wait = max(0.0, min(release, deadline) - now)
+            self.stats['busy_wait_s'] += wait
+            time.sleep(wait)
+
+    def spi_writebyte(self, value):
+        self.stats['spi_calls'] += 1
+        self.record(bytes([value & 0xFF]))
+
+    def spi_writebytes(self, data):
+        self.stats['spi_calls'] += 1
+        self.record(bytes(data))
+
+    def delay_ms(self, delaytime):
+        time.sleep(delaytime / 1000.0)
+
+    def module_init(self):
+        self.stats['module_init'] += 1
+
+    def module_exit(self):
+        self.stats['module_exit'] += 1
+
+    def spi_readbyte(self, Reg):
+        # Temperature register reads report room temperature
+        return 25
+
+    def record(self, data: bytes) -> None:
+        """
+        Appends bytes to every selected controller, a low DC pin starts a new command
+        """
+        self.stats['spi_bytes'] += len(data)
+        with self.lock:
+            for cs, (name, dc, _) in self.chips.items():
+                if self.pins[cs]:
+                    continue
+                transactions = self.transactions[name]
+                if self.pins.get(dc, 1):
+                    if not transactions:
+                        raise RuntimeError(f'{name}: data sent before any command')
+                    transactions[-1][1].extend(data)
+                    continue
+                for command in data:
+                    transactions.append((command, bytearray()))
+                    if command == DISPLAY_REFRESH:
+                        self.stats['refreshes'] += 1
+                        self.busy_until[name] = time.monotonic() + self.refresh_s
+
+    def get_ram(self, name: str, command: int) -> bytes:
+        """
+        Last data written after command to one controller, empty when it was never written
+        """
+        for sent, data in reversed(self.transactions[name]):
+            if sent == command:
+                return bytes(data)
+        return b''
+
+    def get_panel_images(self) -> Tuple[Image.Image, Image.Image]:
+        """
+        Rebuilds [black, red] images from the controller RAM, in the format EPD.display takes them
+        """
+        # Imported here, the driver imports epdconfig which imports this module for the simulated backend
+        from display.lib_epd12in48b import CONTROLLER_REGIONS
+
+        black = np.full((self.height, self.width // 8), 0xFF, dtype=np.uint8)
+        red = np.full((self.height, self.width // 8), 0xFF, dtype=np.uint8)
+        for name, rows, cols in CONTROLLER_REGIONS:
+            shape = (rows[1] - rows[0], cols[1] - cols[0])
+            for plane, command, invert in ((black, DATA_START_TRANSMISSION_1, False),
+                                           (red, DATA_START_TRANSMISSION_2, True)):
+                ram = self.get_ram(name, command)
+                if len(ram) != shape[0] * shape[1]:
+                    continue
+                window = np.frombuffer(ram, dtype=np.uint8).reshape(shape)
+                plane[rows[0]:rows[1], cols[0]:cols[1]] = np.invert(window) if invert else window
+
+        size = (self.width, self.height)
+        return Image.frombytes('1', size, black.tobytes()), Image.frombytes('1', size, red.tobytes())
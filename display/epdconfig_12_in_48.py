@@ -28,11 +28,11 @@ THE SOFTWARE.
 """
 import logging
 import os
+import sys
+import threading
 import time
 from ctypes import *
 
-import RPi.GPIO as GPIO
-
 EPD_SCK_PIN = 11
 EPD_MOSI_PIN = 10
 
@@ -52,106 +52,162 @@ EPD_S1_BUSY_PIN = 19
 EPD_M2_BUSY_PIN = 27
 EPD_S2_BUSY_PIN = 24
 
-find_dirs = [
-    os.path.dirname(os.path.realpath(__file__)),
-    '/usr/local/lib',
-    '/usr/lib',
-]
-spi = None
-for find_dir in find_dirs:
-    val = int(os.popen('getconf LONG_BIT').read())
-    logging.debug("System is %d bit" % val)
-    if val == 64:
-        so_filename = os.path.join(find_dir, 'epd_12_in_48_lib_64bit.so')
-    else:
-        so_filename = os.path.join(find_dir, 'epd_12_in_48_lib_32bit.so')
-    if os.path.exists(so_filename):
-        spi = CDLL(so_filename)
-        break
-if spi is None:
-    RuntimeError('Cannot find DEV_Config.so')
-
-
-def digital_write(pin, value):
-    GPIO.output(pin, value)
-
-
-def digital_read(pin):
-    return GPIO.input(pin)
-
-
-def spi_writebyte(value):
-    spi.DEV_SPI_WriteByte(value)
-
-
-def delay_ms(delaytime):
-    time.sleep(delaytime / 1000.0)
-
-
-def module_init():
-    GPIO.setmode(GPIO.BCM)
-    GPIO.setwarnings(False)
-    GPIO.setup(EPD_SCK_PIN, GPIO.OUT)
-    GPIO.setup(EPD_MOSI_PIN, GPIO.OUT)
-
-    logging.debug("python call bcm2835 Lib")
-
-    GPIO.setup(EPD_M2S2_RST_PIN, GPIO.OUT)
-    GPIO.setup(EPD_M1S1_RST_PIN, GPIO.OUT)
-    GPIO.setup(EPD_M2S2_DC_PIN, GPIO.OUT)
-    GPIO.setup(EPD_M1S1_DC_PIN, GPIO.OUT)
-    GPIO.setup(EPD_S1_CS_PIN, GPIO.OUT)
-    GPIO.setup(EPD_S2_CS_PIN, GPIO.OUT)
-    GPIO.setup(EPD_M1_CS_PIN, GPIO.OUT)
-    GPIO.setup(EPD_M2_CS_PIN, GPIO.OUT)
-
-    GPIO.setup(EPD_S1_BUSY_PIN, GPIO.IN)
-    GPIO.setup(EPD_S2_BUSY_PIN, GPIO.IN)
-    GPIO.setup(EPD_M1_BUSY_PIN, GPIO.IN)
-    GPIO.setup(EPD_M2_BUSY_PIN, GPIO.IN)
-
-    digital_write(EPD_M1_CS_PIN, 1)
-    digital_write(EPD_S1_CS_PIN, 1)
-    digital_write(EPD_M2_CS_PIN, 1)
-    digital_write(EPD_S2_CS_PIN, 1)
-
-    digital_write(EPD_M2S2_RST_PIN, 0)
-    digital_write(EPD_M1S1_RST_PIN, 0)
-    digital_write(EPD_M2S2_DC_PIN, 1)
-    digital_write(EPD_M1S1_DC_PIN, 1)
-
-    spi.DEV_ModuleInit()
-
-
-def module_exit():
-    digital_write(EPD_M2S2_RST_PIN, 0)
-    digital_write(EPD_M1S1_RST_PIN, 0)
-    digital_write(EPD_M2S2_DC_PIN, 0)
-    digital_write(EPD_M1S1_DC_PIN, 0)
-    digital_write(EPD_S1_CS_PIN, 1)
-    digital_write(EPD_S2_CS_PIN, 1)
-    digital_write(EPD_M1_CS_PIN, 1)
-    digital_write(EPD_M2_CS_PIN, 1)
-
-
-def spi_readbyte(Reg):
-    GPIO.setup(EPD_MOSI_PIN, GPIO.IN)
-    j = 0
-    # time.sleep(0.01)
-    for i in range(0, 8):
-        GPIO.output(EPD_SCK_PIN, GPIO.LOW)
-        # time.sleep(0.01) 
-        j = j << 1
-        if (GPIO.input(EPD_MOSI_PIN) == GPIO.HIGH):
-            j |= 0x01
+# Upper bound between level checks while waiting for BUSY edges, covers missed edges
+BUSY_POLL_S = 0.5
+
+# Largest single transfer handed to the SPI driver (spidev default bufsiz)
+SPI_MAX_TRANSFER = 4096
+
+# 'raspberrypi' drives the real panel, 'simulated' records the traffic (see display/epd_simulator.py)
+BACKEND = os.environ.get('INKAL_EPD_BACKEND', 'raspberrypi')
+
+
+class RaspberryPi:
+    def __init__(self):
+        import RPi.GPIO as GPIO
+
+        self.GPIO = GPIO
+        self.spi = None
+
+        find_dirs = [
+            os.path.dirname(os.path.realpath(__file__)),
+            '/usr/local/lib',
+            '/usr/lib',
+        ]
+        for find_dir in find_dirs:
+            val = int(os.popen('getconf LONG_BIT').read())
+            logging.debug("System is %d bit" % val)
+            if val == 64:
+                so_filename = os.path.join(find_dir, 'epd_12_in_48_lib_64bit.so')
+            else:
+                so_filename = os.path.join(find_dir, 'epd_12_in_48_lib_32bit.so')
+            if os.path.exists(so_filename):
+                self.spi = CDLL(so_filename)
+                break
+        if self.spi is None:
+            RuntimeError('Cannot find DEV_Config.so')
+
+        # Bulk write entry point, only exported by newer builds of the shared library
+        self.spi_write_nbyte = getattr(self.spi, 'DEV_SPI_Write_nByte', None) if self.spi is not None else None
+
+    def digital_write(self, pin, value):
+        self.GPIO.output(pin, value)
+
+    def digital_read(self, pin):
+        return self.GPIO.input(pin)
+
+    def wait_for_high(self, pins, is_high, timeout):
+        """Blocks until is_high(pin) holds for every pin, woken by rising edges instead of spinning.
+        Returns the pins that were still low when the timeout ran out."""
+        edge = threading.Event()
+        for pin in pins:
+            self.GPIO.add_event_detect(pin, self.GPIO.RISING, callback=lambda channel: edge.set())
+        try:
+            remaining = set(pins)
+            deadline = time.monotonic() + timeout
+            while True:
+                edge.clear()
+                remaining = {pin for pin in remaining if not is_high(pin)}
+                left = deadline - time.monotonic()
+                if not remaining or left <= 0:
+                    return remaining
+                edge.wait(min(left, BUSY_POLL_S))
+        finally:
+            for pin in pins:
+                self.GPIO.remove_event_detect(pin)
+
+    def spi_writebyte(self, value):
+        self.spi.DEV_SPI_WriteByte(value)
+
+    def spi_writebytes(self, data):
+        """Streams a whole buffer while the caller holds CS and DC, chunked to SPI_MAX_TRANSFER"""
+        if self.spi_write_nbyte is not None:
+            for offset in range(0, len(data), SPI_MAX_TRANSFER):
+                chunk = data[offset:offset + SPI_MAX_TRANSFER]
+                self.spi_write_nbyte((c_ubyte * len(chunk)).from_buffer_copy(chunk), len(chunk))
         else:
-            j &= 0xfe
-            # time.sleep(0.01)
-        GPIO.output(EPD_SCK_PIN, GPIO.HIGH)
-        # time.sleep(0.01)  
-    GPIO.setup(EPD_MOSI_PIN, GPIO.OUT)
-    return j
-
-
-def delay_ms(delaytime):
-    time.sleep(delaytime / 1000.0)
+            writebyte = self.spi.DEV_SPI_WriteByte
+            for value in data:
+                writebyte(value)
+
+    def delay_ms(self, delaytime):
+        time.sleep(delaytime / 1000.0)
+
+    def module_init(self):
+        GPIO = self.GPIO
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setwarnings(False)
+        GPIO.setup(EPD_SCK_PIN, GPIO.OUT)
+        GPIO.setup(EPD_MOSI_PIN, GPIO.OUT)
+
+        logging.debug("python call bcm2835 Lib")
+
+        GPIO.setup(EPD_M2S2_RST_PIN, GPIO.OUT)
+        GPIO.setup(EPD_M1S1_RST_PIN, GPIO.OUT)
+        GPIO.setup(EPD_M2S2_DC_PIN, GPIO.OUT)
+        GPIO.setup(EPD_M1S1_DC_PIN, GPIO.OUT)
+        GPIO.setup(EPD_S1_CS_PIN, GPIO.OUT)
+        GPIO.setup(EPD_S2_CS_PIN, GPIO.OUT)
+        GPIO.setup(EPD_M1_CS_PIN, GPIO.OUT)
+        GPIO.setup(EPD_M2_CS_PIN, GPIO.OUT)
+
+        GPIO.setup(EPD_S1_BUSY_PIN, GPIO.IN)
+        GPIO.setup(EPD_S2_BUSY_PIN, GPIO.IN)
+        GPIO.setup(EPD_M1_BUSY_PIN, GPIO.IN)
+        GPIO.setup(EPD_M2_BUSY_PIN, GPIO.IN)
+
+        self.digital_write(EPD_M1_CS_PIN, 1)
+        self.digital_write(EPD_S1_CS_PIN, 1)
+        self.digital_write(EPD_M2_CS_PIN, 1)
+        self.digital_write(EPD_S2_CS_PIN, 1)
+
+        self.digital_write(EPD_M2S2_RST_PIN, 0)
+        self.digital_write(EPD_M1S1_RST_PIN, 0)
+        self.digital_write(EPD_M2S2_DC_PIN, 1)
+        self.digital_write(EPD_M1S1_DC_PIN, 1)
+
+        self.spi.DEV_ModuleInit()
+
+    def module_exit(self):
+        self.digital_write(EPD_M2S2_RST_PIN, 0)
+        self.digital_write(EPD_M1S1_RST_PIN, 0)
+        self.digital_write(EPD_M2S2_DC_PIN, 0)
+        self.digital_write(EPD_M1S1_DC_PIN, 0)
+        self.digital_write(EPD_S1_CS_PIN, 1)
+        self.digital_write(EPD_S2_CS_PIN, 1)
+        self.digital_write(EPD_M1_CS_PIN, 1)
+        self.digital_write(EPD_M2_CS_PIN, 1)
+
+    def spi_readbyte(self, Reg):
+        GPIO = self.GPIO
+        GPIO.setup(EPD_MOSI_PIN, GPIO.IN)
+        j = 0
+        # time.sleep(0.01)
+        for i in range(0, 8):
+            GPIO.output(EPD_SCK_PIN, GPIO.LOW)
+            # time.sleep(0.01) 
+            j = j << 1
+            if (GPIO.input(EPD_MOSI_PIN) == GPIO.HIGH):
+                j |= 0x01
+            else:
+                j &= 0xfe
+                # time.sleep(0.01)
+            GPIO.output(EPD_SCK_PIN, GPIO.HIGH)
+            # time.sleep(0.01)  
+        GPIO.setup(EPD_MOSI_PIN, GPIO.OUT)
+        return j
+
+
+def set_implementation(impl):
+    """Routes the module level hardware functions to impl, e.g. a SimulatedPanel in tests"""
+    global implementation
+    implementation = impl
+    for func in [x for x in dir(impl) if not x.startswith('_')]:
+        setattr(sys.modules[__name__], func, getattr(impl, func))
+
+
+if BACKEND == 'simulated':
+    from display.epd_simulator import SimulatedPanel
+    set_implementation(SimulatedPanel())
+else:
+    set_implementation(RaspberryPi())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory mapped framebuffer file shared between the renderer and the display side.
+
+Fixed layout: a 64 byte header followed by the packed black and red planes (epd_buffer format, 1 bit per pixel).
+The header holds a magic, the layout version, the panel dimensions, a sequence number and a CRC32 of both planes.
+Writers bump the sequence number to an odd value before touching the planes and to the next even value once the
+checksum is in place, so readers can tell a frame that is being written or was replaced while they used it.
+"""
+
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Tuple
+
+from PIL import Image
+
+from display import epd_buffer
+
+DEFAULT_FRAMEBUFFER_PATH = '/dev/shm/inkal-frame.bin'
+
+MAGIC = b'INKF'
+VERSION = 1
+# magic, version, width, height, sequence number, checksum
+HEADER = struct.Struct('<4sIIIQI')
+HEADER_SIZE = 64
+SEQ_OFFSET = 16
+CHECKSUM_OFFSET = 24
+
+
+class FrameBufferError(Exception):
+    """
+    Raised when the framebuffer file does not match the expected layout or holds no complete frame
+    """
+
+
+def get_file_size(width: int, height: int) -> int:
+    return HEADER_SIZE + 2 * (width * height // 8)
+
+
+class FrameBufferWriter:
+    """
+    Renderer side, writes frames in place into the mapped file
+    """
+
+    def __init__(self, path: str = DEFAULT_FRAMEBUFFER_PATH, width: int = 1304, height: int = 984):
+        self.width = width
+        self.height = height
+        self.plane_bytes = width * height // 8
+        size = get_file_size(width, height)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            header = os.pread(fd, HEADER.size, 0)
+            if os.fstat(fd).st_size != size or len(header) < HEADER.size or \
+                    HEADER.unpack(header)[:4] != (MAGIC, VERSION, width, height):
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+                os.pwrite(fd, HEADER.pack(MAGIC, VERSION, width, height, 0, 0), 0)
+            self.mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+
+    @property
+    def seq(self) -> int:
+        return struct.unpack_from('<Q', self.mm, SEQ_OFFSET)[0]
+
+    def write(self, black_image: Image.Image, red_image: Image.Image) -> int:
+        black_buf, red_buf = epd_buffer.pack_planes(black_image, red_image, self.width, self.height)
+        return self.write_buffers(black_buf, red_buf)
+
+    def write_buffers(self, black_buf: bytes, red_buf: bytes) -> int:
+        """
+        Publishes packed planes and returns the sequence number of the new frame
+        """
+        if len(black_buf) != self.plane_bytes or len(red_buf) != self.plane_bytes:
+            raise ValueError(f'Planes must be {self.plane_bytes} bytes each')
+        seq = self.seq | 1
+        struct.pack_into('<Q', self.mm, SEQ_OFFSET, seq)
+        self.mm[HEADER_SIZE:HEADER_SIZE + self.plane_bytes] = black_buf
+        self.mm[HEADER_SIZE + self.plane_bytes:] = red_buf
+        struct.pack_into('<I', self.mm, CHECKSUM_OFFSET, zlib.crc32(red_buf, zlib.crc32(black_buf)))
+        struct.pack_into('<Q', self.mm, SEQ_OFFSET, seq + 1)
+        return seq + 1
+
+    def close(self) -> None:
+        self.mm.close()
+
+
+class FrameBufferReader:
+    """
+    Display side, hands out the planes as views into the mapped file
+    """
+
+    def __init__(self, path: str = DEFAULT_FRAMEBUFFER_PATH, width: int = 1304, height: int = 984):
+        self.width = width
+        self.height = height
+        self.plane_bytes = width * height // 8
+        try:
+            with open(path, 'rb') as file:
+                self.mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise FrameBufferError(f'Could not map framebuffer {path}: {e}') from e
+
+        if len(self.mm) != get_file_size(width, height):
+            raise FrameBufferError(f'Framebuffer {path} has {len(self.mm)} bytes, expected a {width}x{height} frame')
+        magic, version, file_width, file_height, _, _ = HEADER.unpack_from(self.mm)
+        if (magic, version, file_width, file_height) != (MAGIC, VERSION, width, height):
+            raise FrameBufferError(f'Framebuffer {path} does not hold a version {VERSION} {width}x{height} frame')
+        self.view = memoryview(self.mm)
+
+    @property
+    def seq(self) -> int:
+        return struct.unpack_from('<Q', self.mm, SEQ_OFFSET)[0]
+
+    def read(self, timeout: float = 1.0) -> Tuple[int, memoryview, memoryview]:
+        """
+        Returns (sequence number, black plane, red plane) of the last complete frame, waiting up to timeout for
+        a write in progress. The planes are not copied, use is_unchanged(seq) to check they were not replaced.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            seq = self.seq
+            if seq and not seq & 1:
+                black = self.view[HEADER_SIZE:HEADER_SIZE + self.plane_bytes]
+                red = self.view[HEADER_SIZE + self.plane_bytes:]
+                checksum = struct.unpack_from('<I', self.mm, CHECKSUM_OFFSET)[0]
+                if zlib.crc32(red, zlib.crc32(black)) == checksum and self.is_unchanged(seq):
+                    return seq, black, red
+            elif not seq:
+                raise FrameBufferError('Framebuffer holds no frame yet')
+            if time.monotonic() > deadline:
+                raise FrameBufferError(f'No complete frame within {timeout} s (sequence {seq})')
+            time.sleep(0.001)
+
+    def is_unchanged(self, seq: int) -> bool:
+        return self.seq == seq
+
+    def close(self) -> None:
+        self.view.release()
+        self.mm.close()
@@ -26,18 +26,32 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 #
+import hashlib
 import time
 
 import display.epdconfig_12_in_48 as epdconfig
+from display import epd_buffer
 
 EPD_WIDTH       = 1304
 EPD_HEIGHT      = 984
-BUSY_TIMEOUT_MS = 200
+BUSY_TIMEOUT_S  = 60
+
+# Controller windows: pixel rows and byte columns as [start, end), in upload order
+CONTROLLER_REGIONS = (
+    ('S2', (0, 492), (0, 81)),      # 648*492
+    ('M2', (0, 492), (81, 163)),    # 656*492
+    ('M1', (492, 984), (0, 81)),    # 648*492
+    ('S1', (492, 984), (81, 163)),  # 656*492
+)
 
 class EPD(object):
-    def __init__(self):
+    def __init__(self, busy_timeout=BUSY_TIMEOUT_S):
         self.width = EPD_WIDTH
         self.height = EPD_HEIGHT
+        self.busy_timeout = busy_timeout
+        # Controller name -> digest of the region last shown by it, see display_buffers
+        self.region_digests = {}
+        self.lut_fast = False
         
         self.EPD_M1_CS_PIN  = epdconfig.EPD_M1_CS_PIN
         self.EPD_S1_CS_PIN  = epdconfig.EPD_S1_CS_PIN
@@ -152,121 +166,93 @@ class EPD(object):
         self.SetLut()
         
     def display(self, BlackImage, RedImage):
+        Blackbuf, Redbuf = epd_buffer.pack_planes(BlackImage, RedImage, self.width, self.height)
+        self.display_buffers(Blackbuf, Redbuf)
+
+    def display_buffers(self, Blackbuf, Redbuf, force=False, fast=False):
+        """Uploads already packed planes (see epd_buffer.pack_planes) and refreshes the panel.
+        Only controllers whose region differs from the last frame sent to them are uploaded and refreshed.
+        force is True for all controllers or the names of those to refresh fully even if unchanged.
+        With fast, changes that leave the red plane untouched use the fast waveform.
+        Returns ('fast' or 'full', names of the refreshed controllers), (None, []) when nothing changed."""
         start = time.process_time()
-        
-        Blackbuf = [0x00] * int(self.width * self.height / 8)
-        blackconvert = BlackImage.convert('1')       
-        bimwidth, bimheight = blackconvert.size 
-        Blackpixles = blackconvert.load()
-        temp=0;
-        for y in range(0, bimheight):
-            for x in range(0, bimwidth):
-                if Blackpixles[x, y] < 127:           # black
-                    Blackbuf[int((x + y*self.width)/8)] &= ~(0x80>>temp)
-                else:                           # white
-                    Blackbuf[int((x + y*self.width)/8)] |= (0x80>>temp)
-                temp=temp+1
-                if(temp==8):
-                    temp=0
-                    
-        Redbuf = [0x00] * int(self.width * self.height / 8)
-        redconvert = RedImage.convert('1')
-        rimwidth, rimheight = redconvert.size 
-        Redpixles = redconvert.load()
-        temp=0;
-        for y in range(0, rimheight):
-            for x in range(0, rimwidth):
-                if Redpixles[x, y] < 127:           # black
-                    Redbuf[int((x + y*self.width)/8)] &= ~(0x80>>temp)
-                else:                           # white
-                    Redbuf[int((x + y*self.width)/8)] |= (0x80>>temp)
-                temp=temp+1
-                if(temp==8):
-                    temp=0
-                    
-        #S2 part 648*492
-        self.S2_SendCommand(0x10)
-        for y in  range(0, 492):
-            for x in  range(0, 81):
-                self.S2_SendData(Blackbuf[y*163 + x])
-        self.S2_SendCommand(0x13)
-        for y in  range(0, 492):
-            for x in  range(0, 81):
-                self.S2_SendData(~Redbuf[y*163 + x])
-                
-        #M2 part 656*492
-        self.M2_SendCommand(0x10)
-        for y in  range(0, 492):
-            for x in  range(81, 163):
-                self.M2_SendData(Blackbuf[y*163 + x])
-        self.M2_SendCommand(0x13)
-        for y in  range(0, 492):
-            for x in  range(81, 163):
-                self.M2_SendData(~Redbuf[y*163 + x])
+        forced = {name for name, _, _ in CONTROLLER_REGIONS} if force is True else set(force or ())
+        digests = self.get_region_digests(Blackbuf, Redbuf)
+        changed = [name for name, _, _ in CONTROLLER_REGIONS
+                   if name in forced or digests[name] != self.region_digests.get(name)]
+        if not changed:
+            return None, []
+        # The waveform is loaded into all controllers, one forced controller makes the whole refresh a full one
+        fast = fast and not forced and all(
+            digests[name]['red'] == self.region_digests.get(name, {}).get('red') for name in changed
+        )
+        if fast != self.lut_fast:
+            self.SetLut(fast)
+        Redbuf = epd_buffer.invert(Redbuf)
+
+        for name, rows, cols in CONTROLLER_REGIONS:
+            if name not in changed:
+                continue
+            send_command, send_buffer = self.get_senders(name)
+            send_command(0x10)
+            send_buffer(epd_buffer.region(Blackbuf, self.width, rows, cols))
+            send_command(0x13)
+            send_buffer(epd_buffer.region(Redbuf, self.width, rows, cols))
+        # Forget the regions until the refresh completed, their panel state is unknown if it fails
+        for name in changed:
+            self.region_digests.pop(name, None)
 
-        #M1 part 648*492    
-        self.M1_SendCommand(0x10)
-        for y in  range(492, 984):
-            for x in  range(0, 81):
-                self.M1_SendData(Blackbuf[y*163 + x])
-        self.M1_SendCommand(0x13)
-        for y in  range(492, 984):
-            for x in  range(0, 81):
-                self.M1_SendData(~Redbuf[y*163 + x])
-        
-        #S1 part 656*492
-        self.S1_SendCommand(0x10)
-        for y in  range(492, 984):
-            for x in  range(81, 163):
-                self.S1_SendData(Blackbuf[y*163 + x])
-        self.S1_SendCommand(0x13)
-        for y in  range(492, 984):
-            for x in  range(81, 163):
-                self.S1_SendData(~Redbuf[y*163 + x])
-                
         end = time.process_time()
         print("use time: %f"%(end - start))
-        self.TurnOnDisplay()
+        self.TurnOnDisplay(*changed)
+        for name in changed:
+            self.region_digests[name] = digests[name]
+        return ('fast' if fast else 'full'), changed
+
+    def get_region_digests(self, Blackbuf, Redbuf):
+        """Hash of each plane per controller window"""
+        digests = {}
+        for name, rows, cols in CONTROLLER_REGIONS:
+            digests[name] = {
+                'black': hashlib.sha256(epd_buffer.region(Blackbuf, self.width, rows, cols)).hexdigest(),
+                'red': hashlib.sha256(epd_buffer.region(Redbuf, self.width, rows, cols)).hexdigest(),
+            }
+        return digests
+
+    def get_senders(self, name):
+        return {
+            'M1': (self.M1_SendCommand, self.M1_SendBuffer),
+            'S1': (self.S1_SendCommand, self.S1_SendBuffer),
+            'M2': (self.M2_SendCommand, self.M2_SendBuffer),
+            'S2': (self.S2_SendCommand, self.S2_SendBuffer),
+        }[name]
 
     def clear(self):
         """Clear contents of image buffer"""
         start = time.process_time()
+        self.region_digests = {}
+        if self.lut_fast:
+            self.SetLut()
         
         self.S2_SendCommand(0x10)
-        for y in  range(0, 492):
-            for x in  range(0, 81):
-                self.S2_SendData(0xff)        
+        self.S2_SendBuffer(bytes([0xff]) * (492 * 81))
         self.S2_SendCommand(0x13)
-        for y in  range(0, 492):
-            for x in  range(0, 81):
-                self.S2_SendData(0x00)
+        self.S2_SendBuffer(bytes([0x00]) * (492 * 81))
                 
         self.M2_SendCommand(0x10)
-        for y in  range(0, 492):
-            for x in  range(81, 163):
-                self.M2_SendData(0xff)
+        self.M2_SendBuffer(bytes([0xff]) * (492 * 82))
         self.M2_SendCommand(0x13)
-        for y in  range(0, 492):
-            for x in  range(81, 163):
-                self.M2_SendData(0x00)       
+        self.M2_SendBuffer(bytes([0x00]) * (492 * 82))
                     
         self.M1_SendCommand(0x10)
-        for y in  range(492, 984):
-            for x in  range(0, 81):
-                self.M1_SendData(0xff)
+        self.M1_SendBuffer(bytes([0xff]) * (492 * 81))
         self.M1_SendCommand(0x13)
-        for y in  range(492, 984):
-            for x in  range(0, 81):
-                self.M1_SendData(0x00)
+        self.M1_SendBuffer(bytes([0x00]) * (492 * 81))
                 
         self.S1_SendCommand(0x10)
-        for y in  range(492, 984):
-            for x in  range(81, 163):
-                self.S1_SendData(0xff)
+        self.S1_SendBuffer(bytes([0xff]) * (492 * 82))
         self.S1_SendCommand(0x13)
-        for y in  range(492, 984):
-            for x in  range(81, 163):
-                self.S1_SendData(0x00)
+        self.S1_SendBuffer(bytes([0x00]) * (492 * 82))
                 
         end = time.process_time()
         print (end)
@@ -296,14 +282,17 @@ class EPD(object):
         print("module_exit")
         epdconfig.module_exit()
 
-    def TurnOnDisplay(self):
+    def TurnOnDisplay(self, *controllers):
+        """Refreshes the given controllers, all four by default. M1 and M2 power their slaves, so both always power on."""
+        controllers = controllers or ('M1', 'S1', 'M2', 'S2')
         self.M1M2_SendCommand(0x04)  
         time.sleep(0.3) 
-        self.M1S1M2S2_SendCommand(0x12) 
-        self.M1_ReadBusy()
-        self.S1_ReadBusy()
-        self.M2_ReadBusy()
-        self.S2_ReadBusy()   
+        if len(controllers) == 4:
+            self.M1S1M2S2_SendCommand(0x12) 
+        else:
+            for name in controllers:
+                self.get_senders(name)[0](0x12)
+        self.ReadBusy(*controllers)
         
     """   M1S1M2S2 Write register address and data     """
     def M1S1M2S2_SendCommand(self, cmd):
@@ -364,6 +353,12 @@ class EPD(object):
         epdconfig.digital_write(self.EPD_S2_CS_PIN, 0)
         epdconfig.spi_writebyte(val)
         epdconfig.digital_write(self.EPD_S2_CS_PIN, 1)
+    def S2_SendBuffer(self, buf):
+        # DC and CS are held once for the whole buffer instead of toggling per byte
+        epdconfig.digital_write(self.EPD_M2S2_DC_PIN, 1)
+        epdconfig.digital_write(self.EPD_S2_CS_PIN, 0)
+        epdconfig.spi_writebytes(buf)
+        epdconfig.digital_write(self.EPD_S2_CS_PIN, 1)
         
     """   M2 Write register address and data     """
     def M2_SendCommand(self, cmd):
@@ -376,6 +371,11 @@ class EPD(object):
         epdconfig.digital_write(self.EPD_M2_CS_PIN, 0)
         epdconfig.spi_writebyte(val) 
         epdconfig.digital_write(self.EPD_M2_CS_PIN, 1)
+    def M2_SendBuffer(self, buf):
+        epdconfig.digital_write(self.EPD_M2S2_DC_PIN, 1)
+        epdconfig.digital_write(self.EPD_M2_CS_PIN, 0)
+        epdconfig.spi_writebytes(buf)
+        epdconfig.digital_write(self.EPD_M2_CS_PIN, 1)
 
     """   S1 Write register address and data     """
     def S1_SendCommand(self, cmd):
@@ -388,6 +388,11 @@ class EPD(object):
         epdconfig.digital_write(self.EPD_S1_CS_PIN, 0)
         epdconfig.spi_writebyte(val)
         epdconfig.digital_write(self.EPD_S1_CS_PIN, 1)
+    def S1_SendBuffer(self, buf):
+        epdconfig.digital_write(self.EPD_M1S1_DC_PIN, 1)
+        epdconfig.digital_write(self.EPD_S1_CS_PIN, 0)
+        epdconfig.spi_writebytes(buf)
+        epdconfig.digital_write(self.EPD_S1_CS_PIN, 1)
         
     """   M1 Write register address and data     """
     def M1_SendCommand(self, cmd):
@@ -400,65 +405,40 @@ class EPD(object):
         epdconfig.digital_write(self.EPD_M1_CS_PIN, 0)
         epdconfig.spi_writebyte(val)
         epdconfig.digital_write(self.EPD_M1_CS_PIN, 1)
+    def M1_SendBuffer(self, buf):
+        epdconfig.digital_write(self.EPD_M1S1_DC_PIN, 1)
+        epdconfig.digital_write(self.EPD_M1_CS_PIN, 0)
+        epdconfig.spi_writebytes(buf)
+        epdconfig.digital_write(self.EPD_M1_CS_PIN, 1)
 
     #Busy
-    def M1_ReadBusy(self):
-        self.M1_SendCommand(0x71) 
-        busy = epdconfig.digital_read(self.EPD_M1_BUSY_PIN) 
-        busy = not(busy & 0x01) 
-        iter = 0
-        while(busy):
-            iter += 1
-            self.M1_SendCommand(0x71) 
-            busy = epdconfig.digital_read(self.EPD_M1_BUSY_PIN) 
-            busy = not(busy & 0x01) 
-            if iter > BUSY_TIMEOUT_MS:
-                print("Forced e-paper busy release")
-                break
+    def ReadBusy(self, *controllers):
+        """Waits until all given controllers ('M1', 'S1', 'M2', 'S2') are idle, watching their BUSY pins at once"""
+        busy_pins = {
+            'M1': (self.EPD_M1_BUSY_PIN, self.M1_SendCommand),
+            'S1': (self.EPD_S1_BUSY_PIN, self.S1_SendCommand),
+            'M2': (self.EPD_M2_BUSY_PIN, self.M2_SendCommand),
+            'S2': (self.EPD_S2_BUSY_PIN, self.S2_SendCommand),
+        }
+        pins = {busy_pins[name][0]: name for name in controllers}
+
+        def is_idle(pin):
+            busy_pins[pins[pin]][1](0x71)
+            return epdconfig.digital_read(pin) & 0x01
+
+        still_busy = epdconfig.wait_for_high(list(pins), is_idle, self.busy_timeout)
+        if still_busy:
+            names = ', '.join(sorted(pins[pin] for pin in still_busy))
+            raise TimeoutError("e-Paper controller(s) %s still busy after %.0f s" % (names, self.busy_timeout))
         time.sleep(0.2)
+    def M1_ReadBusy(self):
+        self.ReadBusy('M1')
     def M2_ReadBusy(self):
-        self.M2_SendCommand(0x71) 
-        busy = epdconfig.digital_read(self.EPD_M2_BUSY_PIN) 
-        busy = not(busy & 0x01) 
-        self.M2_SendCommand(0x71) 
-        iter = 0
-        while(busy):
-            iter += 1
-            self.M2_SendCommand(0x71) 
-            busy = epdconfig.digital_read(self.EPD_M2_BUSY_PIN) 
-            busy =not(busy & 0x01)
-            if iter > BUSY_TIMEOUT_MS:
-                print("Forced e-paper busy release")
-                break
-        time.sleep(0.2)
+        self.ReadBusy('M2')
     def S1_ReadBusy(self):
-        self.S1_SendCommand(0x71) 
-        busy = epdconfig.digital_read(self.EPD_S1_BUSY_PIN) 
-        busy = not(busy & 0x01) 
-        iter = 0
-        while(busy):
-            iter += 1
-            self.S1_SendCommand(0x71) 
-            busy = epdconfig.digital_read(self.EPD_S1_BUSY_PIN) 
-            busy = not(busy & 0x01)
-            if iter > BUSY_TIMEOUT_MS:
-                print("Forced e-paper busy release")
-                break
-        time.sleep(0.2)        
+        self.ReadBusy('S1')
     def S2_ReadBusy(self):
-        self.S2_SendCommand(0x71) 
-        busy = epdconfig.digital_read(self.EPD_S2_BUSY_PIN) 
-        busy = not(busy & 0x01) 
-        iter = 0
-        while(busy):
-            iter += 1
-            self.S2_SendCommand(0x71) 
-            busy = epdconfig.digital_read(self.EPD_S2_BUSY_PIN) 
-            busy = not(busy & 0x01) 
-            if iter > BUSY_TIMEOUT_MS:
-                print("Forced e-paper busy release")
-                break
-        time.sleep(0.2)            
+        self.ReadBusy('S2')
 
     lut_vcom1 = [
         0x00,	0x10,	0x10,	0x01,	0x08,	0x01,
@@ -521,27 +501,32 @@ class EPD(object):
         0x00,	0x00,	0x00,	0x00,	0x00,	0x00,
     ]
     
-    def SetLut(self):
-        self.M1S1M2S2_SendCommand(0x20) #vcom
-        for count in range(0, 60):
-            self.M1S1M2S2_SendData(self.lut_vcom1[count])
-
-        self.M1S1M2S2_SendCommand(0x21) #red not use
-        for count in range(0, 60):
-            self.M1S1M2S2_SendData(self.lut_ww1[count])
-
-        self.M1S1M2S2_SendCommand(0x22) #bw r
-        for count in range(0, 60):
-            self.M1S1M2S2_SendData(self.lut_bw1[count])   # bw=r
-
-        self.M1S1M2S2_SendCommand(0x23) #wb w
-        for count in range(0, 60):
-            self.M1S1M2S2_SendData(self.lut_wb1[count])   # wb=w
-
-        self.M1S1M2S2_SendCommand(0x24) #bb b
-        for count in range(0, 60):
-            self.M1S1M2S2_SendData(self.lut_bb1[count])   # bb=b
-            
-        self.M1S1M2S2_SendCommand(0x25) #bb b
-        for count in range(0, 60):
-            self.M1S1M2S2_SendData(self.lut_ww1[count])   # bb=b
+    # Fast black/white update: one short drive phase, no flashing and no red phase.
+    # Red pixels are left floating at GND, so only use it when the red plane is unchanged.
+    lut_vcom_fast = [
+        0x00,	0x14,	0x00,	0x00,	0x00,	0x01,
+    ] + [0x00] * 54
+    lut_ww_fast = [
+        0x00,	0x14,	0x00,	0x00,	0x00,	0x01,
+    ] + [0x00] * 54
+    lut_r_fast = [0x00] * 60
+    lut_w_fast = [
+        0x80,	0x14,	0x00,	0x00,	0x00,	0x01,
+    ] + [0x00] * 54
+    lut_k_fast = [
+        0x40,	0x14,	0x00,	0x00,	0x00,	0x01,
+    ] + [0x00] * 54
+
+    def SetLut(self, fast=False):
+        """Loads the full refresh waveform, or the fast black/white one (see display_buffers)"""
+        if fast:
+            luts = (self.lut_vcom_fast, self.lut_ww_fast, self.lut_r_fast, self.lut_w_fast, self.lut_k_fast, self.lut_ww_fast)
+        else:
+            luts = (self.lut_vcom1, self.lut_ww1, self.lut_bw1, self.lut_wb1, self.lut_bb1, self.lut_ww1)
+
+        # 0x20 vcom, 0x21 red not use, 0x22 bw=r, 0x23 wb=w, 0x24 bb=b, 0x25 bb=b
+        for command, lut in zip(range(0x20, 0x26), luts):
+            self.M1S1M2S2_SendCommand(command)
+            for count in range(0, 60):
+                self.M1S1M2S2_SendData(lut[count])
+        self.lut_fast = fast
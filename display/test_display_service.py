@@ -0,0 +1,67 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from PIL import Image, ImageDraw
+
+os.environ.setdefault('INKAL_EPD_BACKEND', 'simulated')
+
+import display.epdconfig_12_in_48 as epdconfig
+from display.display import EInkDisplay
+from display.display_service import DisplayClient, DisplayService, DisplayServiceError
+from display.epd_simulator import SimulatedPanel
+from display.framebuffer import FrameBufferWriter
+
+
+def test_display_service(tmp_path):
+    """
+    Frames submitted over the socket reach the panel, the controllers are initialised only once
+    """
+    panel = SimulatedPanel(refresh_s=0)
+    epdconfig.set_implementation(panel)
+    service = DisplayService(EInkDisplay(984, 1304, state_path=str(tmp_path / 'state.json')),
+                             str(tmp_path / 'display.sock'), str(tmp_path / 'frame.bin'))
+    service.start()
+    try:
+        assert stat.S_IMODE(os.stat(tmp_path / 'display.sock').st_mode) == 0o600
+        client = DisplayClient(str(tmp_path / 'display.sock'), timeout=10)
+        assert client.is_available()
+
+        black = Image.new('1', (1304, 984), 1)
+        red = Image.new('1', (1304, 984), 1)
+        ImageDraw.Draw(black).rectangle((100, 100, 400, 300), fill=0)
+        assert client.display(black, red)
+        assert not client.display(black, red)
+
+        # Concurrent submissions coalesce, every client gets an answer
+        frames = []
+        for offset in range(4):
+            frame = black.copy()
+            ImageDraw.Draw(frame).rectangle((700 + offset * 50, 600, 720 + offset * 50, 620), fill=0)
+            frames.append(frame)
+        threads = [threading.Thread(target=client.display, args=(frame, red)) for frame in frames]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert panel.stats['module_init'] == 1
+        panel_black, _ = panel.get_panel_images()
+        assert any(panel_black.tobytes() == frame.tobytes() for frame in frames)
+
+        # Frames published in the framebuffer file are shown without sending the planes
+        writer = FrameBufferWriter(str(tmp_path / 'frame.bin'))
+        writer.write(black, red)
+        assert client.display_framebuffer(str(tmp_path / 'frame.bin'))
+        panel_black, _ = panel.get_panel_images()
+        assert panel_black.tobytes() == black.tobytes()
+
+        # Other files are not mapped
+        FrameBufferWriter(str(tmp_path / 'other.bin')).write(red, red)
+        with pytest.raises(DisplayServiceError):
+            client.display_framebuffer(str(tmp_path / 'other.bin'))
+    finally:
+        service.stop()
+    assert not client.is_available()
@@ -0,0 +1,108 @@
+import random
+from typing import List
+
+from PIL import Image
+
+from display import epd_buffer
+
+WIDTH = 72
+HEIGHT = 40
+
+
+def random_image(width: int, height: int) -> Image.Image:
+    image = Image.new('RGB', (width, height))
+    image.putdata([
+        (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        for _ in range(width * height)
+    ])
+    return image
+
+
+def reference_display_buffer(image: Image.Image) -> List[int]:
+    """
+    Per-pixel packing loop of lib_epd12in48b.EPD.display
+    """
+    buf = [0x00] * int(WIDTH * HEIGHT / 8)
+    convert = image.convert('1')
+    imwidth, imheight = convert.size
+    pixels = convert.load()
+    temp = 0
+    for y in range(0, imheight):
+        for x in range(0, imwidth):
+            if pixels[x, y] < 127:
+                buf[int((x + y * WIDTH) / 8)] &= ~(0x80 >> temp)
+            else:
+                buf[int((x + y * WIDTH) / 8)] |= (0x80 >> temp)
+            temp = temp + 1
+            if temp == 8:
+                temp = 0
+    return buf
+
+
+def reference_getbuffer(image: Image.Image) -> List[int]:
+    """
+    Per-pixel packing loop of epd_12_in_48.EPD.getbuffer
+    """
+    buf = [0xFF] * (int(WIDTH / 8) * HEIGHT)
+    image_monocolor = image.convert('1')
+    imwidth, imheight = image_monocolor.size
+    pixels = image_monocolor.load()
+
+    if imwidth == WIDTH and imheight == HEIGHT:
+        for y in range(imheight):
+            for x in range(imwidth):
+                if pixels[x, y] == 0:
+                    buf[int((x + y * WIDTH) / 8)] &= ~(0x80 >> (x % 8))
+    elif imwidth == HEIGHT and imheight == WIDTH:
+        for y in range(imheight):
+            for x in range(imwidth):
+                newx = y
+                newy = HEIGHT - x - 1
+                if pixels[x, y] == 0:
+                    buf[int((newx + newy * WIDTH) / 8)] &= ~(0x80 >> (y % 8))
+    return buf
+
+
+def test_pack_planes_matches_display_loop() -> None:
+    """
+    Packed black and red planes are byte identical to the per-pixel loop
+    """
+    random.seed(1)
+    black = random_image(WIDTH, HEIGHT)
+    red = random_image(WIDTH, HEIGHT)
+
+    black_buf, red_buf = epd_buffer.pack_planes(black, red, WIDTH, HEIGHT)
+
+    assert black_buf == bytes(reference_display_buffer(black))
+    assert red_buf == bytes(reference_display_buffer(red))
+
+
+def test_pack_plane_matches_getbuffer() -> None:
+    """
+    Landscape and portrait images pack like getbuffer
+    """
+    random.seed(2)
+    # Thresholded first, dithering depends on the scan direction
+    landscape = random_image(WIDTH, HEIGHT).convert('1')
+    portrait = random_image(HEIGHT, WIDTH).convert('1')
+
+    assert epd_buffer.pack_plane(landscape, WIDTH, HEIGHT) == bytes(reference_getbuffer(landscape))
+    assert epd_buffer.pack_plane(portrait, WIDTH, HEIGHT) == bytes(reference_getbuffer(portrait))
+
+
+def test_pack_plane_rotations() -> None:
+    """
+    Every rotation packs like Image.rotate(angle, expand=True) followed by plain packing
+    """
+    random.seed(2)
+    # Thresholded first, dithering depends on the scan direction
+    landscape = random_image(WIDTH, HEIGHT).convert('1')
+    portrait = random_image(HEIGHT, WIDTH).convert('1')
+
+    for angle, image in ((0, landscape), (90, portrait), (180, landscape), (270, portrait)):
+        expected = bytes(reference_display_buffer(image.rotate(angle, expand=True)))
+        assert epd_buffer.pack_plane(image, WIDTH, HEIGHT, angle) == expected
+
+    # config.json renders a landscape image, turns it by 270 onto a portrait screen, which the panel turns back
+    assert epd_buffer.get_panel_rotation(270, HEIGHT, WIDTH, WIDTH, HEIGHT) == 0
+    assert epd_buffer.get_panel_rotation(90, WIDTH, HEIGHT, WIDTH, HEIGHT) == 90
@@ -0,0 +1,46 @@
+import random
+import struct
+import threading
+
+import pytest
+
+from display import framebuffer
+from display.framebuffer import FrameBufferError, FrameBufferReader, FrameBufferWriter
+
+WIDTH = 64
+HEIGHT = 32
+
+
+def test_framebuffer_round_trip(tmp_path):
+    """
+    Planes written through one mapping are read back through another, torn frames are never returned
+    """
+    path = str(tmp_path / 'frame.bin')
+    writer = FrameBufferWriter(path, WIDTH, HEIGHT)
+    reader = FrameBufferReader(path, WIDTH, HEIGHT)
+    with pytest.raises(FrameBufferError):
+        reader.read(timeout=0)
+
+    black, red = random.randbytes(WIDTH * HEIGHT // 8), random.randbytes(WIDTH * HEIGHT // 8)
+    seq = writer.write_buffers(black, red)
+    read_seq, read_black, read_red = reader.read()
+    assert (read_seq, bytes(read_black), bytes(read_red)) == (seq, black, red)
+    del read_black, read_red
+
+    # A write in progress (odd sequence number) is waited for, not returned
+    struct.pack_into('<Q', writer.mm, framebuffer.SEQ_OFFSET, seq + 1)
+    with pytest.raises(FrameBufferError):
+        reader.read(timeout=0.01)
+    timer = threading.Timer(0.05, writer.write_buffers, (red, black))
+    timer.start()
+    read_seq, read_black, read_red = reader.read()
+    timer.join()
+    assert (read_seq, bytes(read_black), bytes(read_red)) == (seq + 2, red, black)
+    assert reader.is_unchanged(read_seq)
+    writer.write_buffers(black, red)
+    assert not reader.is_unchanged(read_seq)
+
+    # Reopening keeps the last frame, other dimensions are rejected
+    assert FrameBufferWriter(path, WIDTH, HEIGHT).seq == seq + 4
+    with pytest.raises(FrameBufferError):
+        FrameBufferReader(path, WIDTH * 2, HEIGHT)
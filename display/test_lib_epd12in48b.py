@@ -0,0 +1,168 @@
+import os
+import random
+import time
+
+from PIL import Image
+
+os.environ.setdefault('INKAL_EPD_BACKEND', 'simulated')
+
+import display.epdconfig_12_in_48 as epdconfig
+from display import lib_epd12in48b as eink
+from display.epd_simulator import SimulatedPanel
+
+
+def random_plane(width: int, height: int) -> Image.Image:
+    return Image.frombytes('1', (width, height), random.randbytes(width * height // 8))
+
+
+def test_display_simulated():
+    """
+    Frame sent through the driver ends up unchanged in the simulated controllers, with bulk transfers only
+    """
+    panel = SimulatedPanel(refresh_s=0.01)
+    epdconfig.set_implementation(panel)
+
+    epd = eink.EPD(busy_timeout=5)
+    epd.Init()
+    black, red = random_plane(epd.width, epd.height), random_plane(epd.width, epd.height)
+    panel.reset()
+
+    start = time.monotonic()
+    epd.display(black, red)
+    elapsed = time.monotonic() - start
+
+    panel_black, panel_red = panel.get_panel_images()
+    assert panel_black.tobytes() == black.tobytes()
+    assert panel_red.tobytes() == red.tobytes()
+
+    frame_bytes = 2 * epd.width * epd.height // 8
+    assert frame_bytes <= panel.stats['spi_bytes'] < frame_bytes + 100
+    assert panel.stats['spi_calls'] < 100
+    assert panel.stats['refreshes'] == 4
+    assert panel.stats['busy_wait_s'] > 0
+    assert elapsed < 5
+
+
+def test_display_skips_unchanged_frame(tmp_path):
+    """
+    Second display of the same frame neither wakes the controllers nor refreshes, unless forced
+    """
+    from display.display import EInkDisplay
+
+    panel = SimulatedPanel(refresh_s=0)
+    epdconfig.set_implementation(panel)
+    black, red = random_plane(1304, 984), random_plane(1304, 984)
+
+    eink_display = EInkDisplay(984, 1304, state_path=str(tmp_path / 'display_state.json'))
+    assert eink_display.display(black, red)
+    assert panel.stats['refreshes'] == 4
+
+    panel.reset()
+    eink_display = EInkDisplay(984, 1304, state_path=str(tmp_path / 'display_state.json'))
+    assert not eink_display.display(black, red)
+    assert panel.stats['spi_bytes'] == 0
+
+    assert eink_display.display(black, red, force=True)
+    assert panel.stats['refreshes'] == 4
+
+
+def test_display_changed_controllers_only():
+    """
+    A change inside one controller's window uploads and refreshes only that controller
+    """
+    panel = SimulatedPanel(refresh_s=0)
+    epdconfig.set_implementation(panel)
+    epd = eink.EPD(busy_timeout=5)
+    black, red = random_plane(epd.width, epd.height), random_plane(epd.width, epd.height)
+    epd.display(black, red)
+
+    panel.reset()
+    black.paste(0, (10, 10, 200, 100))
+    epd.display(black, red)
+
+    assert [command for command, _ in panel.transactions['S2']].count(0x12) == 1
+    for name in ('M1', 'S1', 'M2'):
+        assert 0x12 not in [command for command, _ in panel.transactions[name]]
+    assert panel.stats['spi_bytes'] < 2 * 492 * 81 + 100
+
+    panel_black, panel_red = panel.get_panel_images()
+    assert panel_black.crop((0, 0, 648, 492)).tobytes() == black.crop((0, 0, 648, 492)).tobytes()
+
+
+def test_display_fast_refresh_budget(tmp_path):
+    """
+    Black-only changes use the fast waveform until the controller used up its budget, then it gets a full refresh
+    """
+    from display.display import EInkDisplay
+
+    panel = SimulatedPanel(refresh_s=0)
+    epdconfig.set_implementation(panel)
+    eink_display = EInkDisplay(984, 1304, state_path=str(tmp_path / 'display_state.json'), fast_refresh_budget=2)
+    black, red = random_plane(1304, 984), random_plane(1304, 984)
+    eink_display.display(black, red)
+    assert eink_display.fast_updates == {'S2': 0, 'M2': 0, 'M1': 0, 'S1': 0}
+
+    for fast_updates in (1, 2):
+        black.paste(fast_updates % 2, (10, 10, 200, 100))
+        eink_display.display(black, red)
+        assert eink_display.fast_updates['S2'] == fast_updates
+        assert eink_display.epd.lut_fast
+        assert panel.get_ram('S2', 0x24) == bytes(eink_display.epd.lut_k_fast)
+
+    panel.reset()
+    black.paste(1, (10, 10, 200, 100))
+    eink_display.display(black, red)
+    assert eink_display.fast_updates['S2'] == 0
+    assert not eink_display.epd.lut_fast
+    assert panel.stats['refreshes'] == 1
+
+    # A red change always needs the full waveform
+    red.paste(0, (700, 600, 800, 700))
+    eink_display.display(black, red)
+    assert eink_display.fast_updates == {'S2': 0, 'M2': 0, 'M1': 0, 'S1': 0}
+    assert not eink_display.epd.lut_fast
+
+    # The counts survive a restart
+    black.paste(0, (10, 10, 200, 100))
+    eink_display.display(black, red)
+    eink_display = EInkDisplay(984, 1304, state_path=str(tmp_path / 'display_state.json'), fast_refresh_budget=2)
+    assert eink_display.fast_updates['S2'] == 1
+
+
+def test_display_fast_refresh_budget_per_controller(tmp_path):
+    """
+    A full refresh of another controller does not reset the budget of one taking fast updates
+    """
+    from display.display import EInkDisplay
+
+    panel = SimulatedPanel(refresh_s=0)
+    epdconfig.set_implementation(panel)
+    eink_display = EInkDisplay(984, 1304, state_path=str(tmp_path / 'display_state.json'), fast_refresh_budget=2)
+    black, red = random_plane(1304, 984), random_plane(1304, 984)
+    eink_display.display(black, red)
+
+    def refreshed():
+        return sorted(name for name, transactions in panel.transactions.items()
+                      if 0x12 in [command for command, _ in transactions])
+
+    # S2 takes black-only changes, S1 red ones in between
+    for step in range(6):
+        panel.reset()
+        if step % 2:
+            red.paste(step % 4 // 2, (700, 600, 800, 700))
+        else:
+            black.paste(step % 4 // 2, (10, 10, 200, 100))
+        eink_display.display(black, red)
+        if step == 3:
+            # S2 used up its budget at step 2, it joins the next refresh with the full waveform
+            assert refreshed() == ['S1', 'S2']
+            assert not eink_display.epd.lut_fast
+        elif step % 2:
+            assert refreshed() == ['S1']
+            assert not eink_display.epd.lut_fast
+        else:
+            assert refreshed() == ['S2']
+            assert eink_display.epd.lut_fast
+        assert eink_display.fast_updates['S2'] <= 2
+        assert eink_display.fast_updates['S1'] == 0
+    assert eink_display.fast_updates['S2'] == 1
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental Calendar sync: keeps a local copy of each calendar's events together with its nextSyncToken.
+
+The first run lists the requested window plus SYNC_AHEAD_DAYS, later runs only ask for the changes since the last
+sync token and apply them (cancelled events are removed, everything else is inserted or replaced). When the token
+expired (410 Gone) or the requested window is no longer covered by the stored one, the calendar is listed again.
+Events that ended before the requested window are dropped on every merge, so the store does not grow with the past.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+from googleapiclient.errors import HttpError
+from typings_google_calendar_api.events import Event as GoogleEvent
+
+from gcal.timestamps import parse_iso
+
+DEFAULT_SYNC_DIR = str(pathlib.Path.home() / '.cache' / 'inkal' / 'calendar')
+
+# The 28 day window moves every day, the stored window reaches this far beyond it so tokens stay usable for weeks
+SYNC_AHEAD_DAYS = 28
+
+
+class CalendarSync:
+    """
+    Per calendar event store, one JSON file per calendar
+    """
+
+    def __init__(self, directory: str = DEFAULT_SYNC_DIR):
+        self.logger = logging.getLogger('maginkcal')
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def sync(self, cal: str, list_events: Callable[..., Dict[str, Any]],
+             minTime: dt.datetime, maxTime: dt.datetime) -> List[GoogleEvent]:
+        """
+        Brings the store of one calendar up to date and returns its events overlapping [minTime, maxTime].
+        list_events(**params) executes one events().list request and returns the response.
+        """
+        store = self.load(cal)
+        if store is not None and store['timeMin'] <= minTime.timestamp() and store['timeMax'] >= maxTime.timestamp():
+            try:
+                changes, store['syncToken'] = self.list_all(list_events, calendarId=cal, singleEvents=True,
+                                                            syncToken=store['syncToken'])
+                for event in changes:
+                    if event.get('status') == 'cancelled':
+                        store['events'].pop(event['id'], None)
+                    else:
+                        store['events'][event['id']] = event
+                self.logger.info(f'Calendar {cal}: {len(changes)} changes since the last sync')
+                store['events'] = {
+                    eventId: event for eventId, event in store['events'].items() if not self.ends_before(event, minTime)
+                }
+                store['timeMin'] = minTime.timestamp()
+            except HttpError as e:
+                if e.resp.status != 410:
+                    raise
+                self.logger.info(f'Calendar {cal}: sync token expired, listing the calendar again')
+                store = None
+        else:
+            store = None
+
+        if store is None:
+            syncMax = maxTime + dt.timedelta(days=SYNC_AHEAD_DAYS)
+            events, syncToken = self.list_all(list_events, calendarId=cal, singleEvents=True,
+                                              timeMin=minTime.isoformat(), timeMax=syncMax.isoformat())
+            store = {
+                'syncToken': syncToken,
+                'timeMin': minTime.timestamp(),
+                'timeMax': syncMax.timestamp(),
+                'events': {event['id']: event for event in events if event.get('status') != 'cancelled'},
+            }
+
+        self.save(cal, store)
+        return [event for event in store['events'].values() if self.overlaps(event, minTime, maxTime)]
+
+    def list_all(self, list_events: Callable[..., Dict[str, Any]], **params: Any):
+        """
+        Follows nextPageToken, returns all items and the nextSyncToken of the last page
+        """
+        items: List[GoogleEvent] = []
+        pageToken: Optional[str] = None
+        while True:
+            page = list_events(pageToken=pageToken, **params)
+            items.extend(page.get('items', []))
+            pageToken = page.get('nextPageToken')
+            if not pageToken:
+                return items, page.get('nextSyncToken')
+
+    def overlaps(self, event: GoogleEvent, minTime: dt.datetime, maxTime: dt.datetime) -> bool:
+        start, end = event['start'], event['end']
+        if start.get('dateTime') is None:
+            # All-day events end on the following day (exclusive)
+            return dt.date.fromisoformat(start['date']) <= maxTime.date() and \
+                dt.date.fromisoformat(end['date']) > minTime.date()
+        return parse_iso(start['dateTime']) < maxTime and parse_iso(end['dateTime']) > minTime
+
+    def ends_before(self, event: GoogleEvent, minTime: dt.datetime) -> bool:
+        end = event['end']
+        if end.get('dateTime') is None:
+            return dt.date.fromisoformat(end['date']) <= minTime.date()
+        return parse_iso(end['dateTime']) <= minTime
+
+    def get_path(self, cal: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(cal.encode()).hexdigest() + '.json')
+
+    def load(self, cal: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.get_path(cal)) as file:
+                store = json.load(file)
+            return store if store.get('syncToken') else None
+        except (OSError, ValueError):
+            return None
+
+    def save(self, cal: str, store: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(store, file)
+            os.replace(tmp_path, self.get_path(cal))
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            self.logger.warning(f'Failed to store calendar {cal}: {e}')
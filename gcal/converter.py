@@ -1,11 +1,15 @@
 from gcal.GoogleAppScriptEvent import GoogleAppScriptEvent
 from gcal.inkal_event import InkalEvent
 
-from typing import List, Dict, Any
+from typing import List, Optional, Sequence
 import datetime as dt
 
 from gcal import GoogleAppScriptTask
 from gcal.inkal_task import InkalTask
+from gcal import timestamps
+from gcal.records import EventColumns, TaskColumns
+
+MIDNIGHT = dt.time(0)
 
 class Converter:
     """
@@ -13,104 +17,59 @@ class Converter:
     """
 
     @staticmethod
-    def to_inkal_events(events: List[GoogleAppScriptEvent]) -> List[InkalEvent]:
+    def to_inkal_events(events: List[GoogleAppScriptEvent]) -> Sequence[InkalEvent]:
         print("Converter.to_inkal_events called")
         """
-        Convert a list of calendar event dicts (from test-events.json) to InkalEvent objects.
+        Convert a list of calendar event dicts (from test-events.json) to InkalEvents, stored column-wise as records.
         """
-        inkal_events = []
-        for event in events:
-            inkal_event: InkalEvent = {
-                "kind": "calendar#event",
-                "summary": event.get("title", ""),
-                # "location": event.get("location", ""),
-            }
-
-            # Parse start and end datetimes
-            start_str = event.get("start")
-            end_str = event.get("end")
-            if start_str:
-                try:
-                    inkal_event["startDatetime"] = dt.datetime.fromisoformat(start_str.replace("Z", "+00:00"))
-                except Exception:
-                    pass
-                    # inkal_event["startDatetime"] = start_str
-            else:
-                inkal_event["startDatetime"] = None
-            if end_str:
-                try:
-                    inkal_event["endDatetime"] = dt.datetime.fromisoformat(end_str.replace("Z", "+00:00"))
-                except Exception:
-                    pass
-                    # inkal_event["endDatetime"] = end_str
-            else:
-                inkal_event["endDatetime"] = None
-
-            # All-day event detection
-            inkal_event["allday"] = (
-                isinstance(inkal_event["startDatetime"], dt.datetime)
-                and inkal_event["startDatetime"].hour == 0
-                and inkal_event["startDatetime"].minute == 0
-                and inkal_event["startDatetime"].second == 0
-                and isinstance(inkal_event["endDatetime"], dt.datetime)
-                and inkal_event["endDatetime"].hour == 0
-                and inkal_event["endDatetime"].minute == 0
-                and inkal_event["endDatetime"].second == 0
-            )
-
-            # Multiday event detection
-            if (
-                isinstance(inkal_event["startDatetime"], dt.datetime)
-                and isinstance(inkal_event["endDatetime"], dt.datetime)
-            ):
-                inkal_event["isMultiday"] = inkal_event["startDatetime"].date() != inkal_event["endDatetime"].date()
-            else:
-                inkal_event["isMultiday"] = False
-
-            # No updatedDatetime/isUpdated in test-events.json, so set to None/False
-            # updated_str = event.get("updated", "")
-            # inkal_event["updatedDatetime"] =  dt.datetime.fromisoformat(updated_str.replace("Z", "+00:00"))
-            inkal_event["updatedDatetime"] = None
-            inkal_event["isUpdated"] = False
+        # Built column by column, see gcal/records.py
+        startDatetimes = [Converter.to_datetime(event.get("start")) for event in events]
+        endDatetimes = [Converter.to_datetime(event.get("end")) for event in events]
 
+        # All-day event detection, multiday event detection
+        alldays = []
+        multidays = []
+        for start, end in zip(startDatetimes, endDatetimes):
+            bounded = start is not None and end is not None
+            alldays.append(bounded and start.time() == MIDNIGHT and end.time() == MIDNIGHT)
+            multidays.append(bounded and start.date() != end.date())
 
-            inkal_events.append(inkal_event)
-        return inkal_events
+        # No updatedDatetime/isUpdated in test-events.json, so set to None/False
+        return EventColumns.from_columns(
+            len(events),
+            kind=["calendar#event"] * len(events),
+            summary=[event.get("title", "") for event in events],
+            startDatetime=startDatetimes,
+            endDatetime=endDatetimes,
+            allday=alldays,
+            isMultiday=multidays,
+            updatedDatetime=[None] * len(events),
+            isUpdated=[False] * len(events),
+        )
 
     @staticmethod
-    def to_inkal_tasks(tasks: List[GoogleAppScriptTask.GoogleAppScriptTask]) -> List[InkalTask]:
+    def to_inkal_tasks(tasks: List[GoogleAppScriptTask.GoogleAppScriptTask]) -> Sequence[InkalTask]:
         print("Converter.to_inkal_tasks called")
         """
-        Convert a list of task dicts (from test-events.json) to InkalTask objects.
+        Convert a list of task dicts (from test-events.json) to InkalTasks, stored column-wise as records.
         """
-        inkal_tasks = []
-        for task in tasks:
-            inkal_task: InkalTask = {
-                "kind": "tasks#task",
-                "title": task.get("title", ""),
-            }
-            due_str = task.get("due")
-            if due_str:
-                try:
-                    inkal_task["due"] = dt.datetime.fromisoformat(due_str.replace("Z", "+00:00")).date()
-                except Exception:
-                    pass
-                    # inkal_task["due"] = due_str
-            else:
-                inkal_task["due"] = None
+        dues = [Converter.to_datetime(task.get("due")) for task in tasks]
 
+        # No isUpdated in test-events.json, so set to False
+        return TaskColumns.from_columns(
+            len(tasks),
+            kind=["tasks#task"] * len(tasks),
+            title=[task.get("title", "") for task in tasks],
+            due=[due.date() if due is not None else None for due in dues],
             # Completed status
-            inkal_task["isCompleted"] = task.get("status", "") == "completed"
+            isCompleted=[task.get("status", "") == "completed" for task in tasks],
+            updated=[Converter.to_datetime(task.get("updated")) for task in tasks],
+            isUpdated=[False] * len(tasks),
+        )
 
-            # No updatedDatetime/isUpdated in test-events.json, so set to None/False
-            updated_str = task.get("updated", "")
-            
-            try:
-                inkal_task["updated"] = dt.datetime.fromisoformat(updated_str.replace("Z", "+00:00"))
-            except Exception:
-                pass
-
-            inkal_task["isUpdated"] = False
-
-            inkal_tasks.append(inkal_task)
-        return inkal_tasks
\ No newline at end of file
+    @staticmethod
+    def to_datetime(isoDatetime: Optional[str]) -> Optional[dt.datetime]:
+        """
+        None for a missing or malformed timestamp, repeated strings are parsed once (gcal/timestamps.py)
+        """
+        return timestamps.parse_optional(isoDatetime)
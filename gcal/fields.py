@@ -0,0 +1,16 @@
+"""
+Partial-response masks for the Calendar and Tasks list requests.
+
+Each converter declares the resource fields it reads (EVENT_FIELDS, TASK_FIELDS), the requests only ask for
+those (partial response).
+googleapiclient already asks for gzip (Accept-Encoding and the "(gzip)" user agent suffix).
+"""
+
+from typing import Iterable
+
+
+def get_list_fields(item_fields: Iterable[str], *page_fields: str) -> str:
+    """
+    -> 'items(a,b),nextPageToken' for a list response whose items only need item_fields
+    """
+    return ",".join((f"items({','.join(item_fields)})", "nextPageToken") + page_fields)
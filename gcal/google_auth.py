@@ -1,13 +1,32 @@
 from __future__ import print_function
-from typing import Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional, Tuple
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
 
+import datetime as dt
 import logging
+import os
 import os.path
 import pathlib
 import pickle
+import tempfile
+import threading
+
+SCOPES: list[str] = [
+    "https://www.googleapis.com/auth/calendar.readonly",
+    "https://www.googleapis.com/auth/tasks.readonly"
+    ]
+
+# Tokens expiring sooner than this are refreshed before use, later ones in the background
+REFRESH_MARGIN = dt.timedelta(minutes=5)
+
+
+def utcnow() -> dt.datetime:
+    # google-auth keeps expiry as a naive UTC datetime
+    return dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
 
 
 class GoogleAuth:
@@ -16,16 +35,16 @@ class GoogleAuth:
     def __init__(self):
         self.logger = logging.getLogger("maginkcal")
         self.currPath = str(pathlib.Path(__file__).parent.absolute())
+        self.documents: Dict[Tuple[str, str], str] = {}
+        self.lock = threading.Lock()
 
 
     def authenticate(self, account: str) -> Tuple[Any, Any]:
         """-> [Calendar, Task]"""
+        return self.build_services(self.load_credentials(account))
 
-        SCOPES: list[str] = [
-            "https://www.googleapis.com/auth/calendar.readonly",
-            "https://www.googleapis.com/auth/tasks.readonly"
-            ]
-        file_path = self.currPath + '/' + account + ".token.pickle"
+    def load_credentials(self, account: str):
+        file_path = self.get_token_path(account)
 
         creds = None
 
@@ -34,9 +53,9 @@ class GoogleAuth:
             with open(file_path, "rb") as token:
                 creds = pickle.load(token)
 
-        # Authenticate if no token
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
+        # Authenticate if no token, refresh if it expired or is about to
+        if not creds or not creds.valid or self.expires_soon(creds):
+            if creds and creds.refresh_token and (creds.expired or self.expires_soon(creds)):
                 creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(
@@ -44,11 +63,110 @@ class GoogleAuth:
                 )
                 creds = flow.run_local_server(port=0)
             # Save the credentials for the next run
-            with open(file_path, "wb") as token:
+            self.save_credentials(account, creds)
+        return creds
+
+    def expires_soon(self, creds) -> bool:
+        return creds.expiry is not None and creds.expiry - utcnow() < REFRESH_MARGIN
+
+    def save_credentials(self, account: str, creds) -> None:
+        # Written atomically, a refresh in the background may race with the process shutting down
+        fd, tmp_path = tempfile.mkstemp(dir=self.currPath, prefix=".token-")
+        try:
+            with os.fdopen(fd, "wb") as token:
                 pickle.dump(creds, token)
+            os.replace(tmp_path, self.get_token_path(account))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_token_path(self, account: str) -> str:
+        return self.currPath + '/' + account + ".token.pickle"
 
-        calendar_service = build(
-            "calendar", "v3", credentials=creds, cache_discovery=False
-        )
-        task_service = build("tasks", "v1", credentials=creds)
+    def build_services(self, creds) -> Tuple[Any, Any]:
+        """
+        Builds the clients from the discovery documents bundled with googleapiclient, no request is needed
+        and every account shares the documents read once
+        """
+        calendar_service = build_from_document(self.get_document("calendar", "v3"), credentials=creds)
+        task_service = build_from_document(self.get_document("tasks", "v1"), credentials=creds)
         return calendar_service, task_service
+
+    def get_document(self, serviceName: str, version: str) -> str:
+        with self.lock:
+            if (serviceName, version) not in self.documents:
+                document = get_static_doc(serviceName, version)
+                if document is None:
+                    raise ValueError(f"No bundled discovery document for {serviceName} {version}")
+                self.documents[serviceName, version] = document
+            return self.documents[serviceName, version]
+
+
+class AccountManager:
+    """
+    Authenticates all accounts concurrently and keeps their tokens fresh in the background
+    """
+
+    def __init__(self, google_auth: Optional[GoogleAuth] = None, max_workers: int = 4):
+        self.logger = logging.getLogger("maginkcal")
+        self.google_auth = google_auth or GoogleAuth()
+        self.max_workers = max_workers
+        self.credentials: Dict[str, Any] = {}
+        self.services: Dict[str, Tuple[Any, Any]] = {}
+        self.stopping = threading.Event()
+        self.refresher: Optional[threading.Thread] = None
+
+    def authenticate_all(self, accounts: Iterable[str]) -> Dict[str, Tuple[Any, Any]]:
+        """
+        -> {account: [Calendar, Task]}, the background refresher is started afterwards
+        """
+        accounts = list(accounts)
+        if not accounts:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(accounts))) as executor:
+            for account, creds in zip(accounts, executor.map(self.google_auth.load_credentials, accounts)):
+                self.credentials[account] = creds
+                self.services[account] = self.google_auth.build_services(creds)
+        self.start_refresher()
+        return self.services
+
+    def start_refresher(self) -> None:
+        if self.refresher is None:
+            self.refresher = threading.Thread(target=self.refresh_ahead, name="token-refresher", daemon=True)
+            self.refresher.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.refresher is not None:
+            self.refresher.join()
+            self.refresher = None
+
+    def refresh_ahead(self) -> None:
+        """
+        Refreshes each token REFRESH_MARGIN before it expires, so requests never wait for the OAuth round-trip
+        """
+        while not self.stopping.is_set():
+            account, expiry = self.get_next_expiry()
+            if account is None:
+                return
+            delay = (expiry - REFRESH_MARGIN - utcnow()).total_seconds()
+            if self.stopping.wait(max(delay, 0)):
+                return
+            try:
+                self.credentials[account].refresh(Request())
+                self.google_auth.save_credentials(account, self.credentials[account])
+                self.logger.info(f"Refreshed token of {account}, valid until {self.credentials[account].expiry}")
+            except Exception as e:
+                self.logger.warning(f"Background token refresh for {account} failed: {e}")
+                # Retried before the next request needs it, not in a tight loop
+                if self.stopping.wait(REFRESH_MARGIN.total_seconds() / 5):
+                    return
+
+    def get_next_expiry(self) -> Tuple[Optional[str], Optional[dt.datetime]]:
+        expiring = [(creds.expiry, account) for account, creds in self.credentials.items()
+                    if creds.expiry is not None and creds.refresh_token]
+        if not expiring:
+            return None, None
+        expiry, account = min(expiring)
+        return account, expiry
@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 
 from __future__ import print_function
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Iterator, List, Optional
 from typings_google_calendar_api.calendars import Calendar
 from typings_google_calendar_api.events import Event as GoogleEvent
 from pytz.tzinfo import DstTzInfo
@@ -10,18 +11,38 @@ from pytz.tzinfo import DstTzInfo
 
 import datetime as dt
 import logging
+import threading
 
+from gcal.calendar_sync import CalendarSync
+from gcal import timestamps
+from gcal.fields import get_list_fields
 from gcal.inkal_event import InkalEvent
 
+# Event fields to_inkal_event reads, the list requests ask for nothing else
+EVENT_FIELDS = ("summary", "start", "end", "updated")
+# Incremental sync also needs to tell which stored event a change or cancellation belongs to
+SYNC_EVENT_FIELDS = EVENT_FIELDS + ("id", "status")
+# Calendar list entry fields list_calendars reads
+CALENDAR_FIELDS = ("id", "summary")
+
 
 class GoogleCalendar:
     """
     Google Calendar API
     """
 
-    def __init__(self, calendar_service):
+    def __init__(self, calendar_service, http_factory: Optional[Callable[[], Any]] = None, max_workers: int = 4,
+                 sync_dir: Optional[str] = None):
+        """
+        http_factory creates the HTTP object each fetch thread executes its requests with, httplib2 objects
+        are not thread safe. By default it authorizes a new one with the service's credentials.
+        With sync_dir the events are kept there and only the changes since the last run are fetched.
+        """
         self.logger = logging.getLogger("maginkcal")
         self.calendar_service = calendar_service
+        self.http_factory = http_factory or self.get_default_http_factory()
+        self.max_workers = max_workers
+        self.calendar_sync = CalendarSync(sync_dir) if sync_dir else None
 
     def list_calendars(self) -> List[Calendar]:
         """
@@ -29,8 +50,16 @@ class GoogleCalendar:
         """
 
         self.logger.info("Getting list of calendars")
-        calendars_result = self.calendar_service.calendarList().list().execute()
-        calendars: List[Calendar] = calendars_result.get("items", [])
+        calendars: List[Calendar] = []
+        pageToken: Optional[str] = None
+        while True:
+            calendars_result = self.calendar_service.calendarList().list(
+                fields=get_list_fields(CALENDAR_FIELDS), pageToken=pageToken
+            ).execute()
+            calendars.extend(calendars_result.get("items", []))
+            pageToken = calendars_result.get("nextPageToken")
+            if not pageToken:
+                break
         if not calendars:
             self.logger.info("No calendars found.")
         for calendar in calendars:
@@ -61,32 +90,90 @@ class GoogleCalendar:
             "Retrieving events between " + minTimeStr + " and " + maxTimeStr + "..."
         )
 
-        # Call the Calendar API
-        google_events: List[GoogleEvent] = []
-        for cal in calendars:
-            event_list: List[GoogleEvent] = self.calendar_service.events().list(
-                calendarId=cal,
-                timeMin=minTimeStr,
-                timeMax=maxTimeStr,
-                singleEvents=True,
-                orderBy="startTime",
-            ).execute()
-            item_list = event_list.get("items", [])
-            google_events.extend(item_list)
-
-
-        if not google_events:
-            self.logger.info("No upcoming events found.")
+        # Call the Calendar API, events are converted while the remaining pages are still being fetched
+        if self.calendar_sync is not None:
+            google_events = self.iter_synced_events(calendars, startDatetime, endDatetime)
+        else:
+            google_events = self.iter_google_events(calendars, minTimeStr, maxTimeStr)
         for google_event in google_events:
             inkal_event = self.to_inkal_event(google_event, localTZ, thresholdHours)
 
             eventList.append(inkal_event)
 
+        if not eventList:
+            self.logger.info("No upcoming events found.")
+
         # We need to sort eventList because the event will be sorted in "calendar order" instead of hours order
         # TODO: improve because of double cycle for now is not much cost
         eventList = sorted(eventList, key=lambda k: k["startDatetime"])
         return eventList
     
+    def iter_google_events(self, calendars: List[str], minTimeStr: str, maxTimeStr: str) -> Iterator[GoogleEvent]:
+        """
+        Fetches all calendars concurrently and yields their events page by page as the pages arrive.
+        Each calendar follows its nextPageToken, so the total latency is about that of the slowest calendar.
+        """
+        local = threading.local()
+
+        def fetch_page(cal: str, pageToken: Optional[str]):
+            if not hasattr(local, "http"):
+                local.http = self.http_factory()
+            request = self.calendar_service.events().list(
+                calendarId=cal,
+                timeMin=minTimeStr,
+                timeMax=maxTimeStr,
+                singleEvents=True,
+                orderBy="startTime",
+                fields=get_list_fields(EVENT_FIELDS),
+                pageToken=pageToken,
+            )
+            return cal, request.execute(http=local.http)
+
+        if not calendars:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calendars))) as executor:
+            pending = {executor.submit(fetch_page, cal, None) for cal in calendars}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    cal, page = future.result()
+                    if page.get("nextPageToken"):
+                        pending.add(executor.submit(fetch_page, cal, page["nextPageToken"]))
+                    yield from page.get("items", [])
+
+    def iter_synced_events(
+        self, calendars: List[str], startDatetime: dt.datetime, endDatetime: dt.datetime
+    ) -> Iterator[GoogleEvent]:
+        """
+        Incremental sync of all calendars concurrently, yields the events of each calendar once it is up to date
+        """
+        local = threading.local()
+
+        def list_events(**params):
+            if not hasattr(local, "http"):
+                local.http = self.http_factory()
+            request = self.calendar_service.events().list(
+                fields=get_list_fields(SYNC_EVENT_FIELDS, "nextSyncToken"), **params
+            )
+            return request.execute(http=local.http)
+
+        if not calendars:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(calendars))) as executor:
+            futures = [
+                executor.submit(self.calendar_sync.sync, cal, list_events, startDatetime, endDatetime)
+                for cal in calendars
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+
+    def get_default_http_factory(self) -> Callable[[], Any]:
+        from google_auth_httplib2 import AuthorizedHttp
+        import httplib2
+
+        credentials = getattr(getattr(self.calendar_service, "_http", None), "credentials", None)
+        return lambda: AuthorizedHttp(credentials, http=httplib2.Http())
+
     def to_inkal_event(self, google_event: GoogleEvent, localTZ, thresholdHours) -> InkalEvent:
         """
         Convert a Google Event to an InkalEvent
@@ -132,9 +219,8 @@ class GoogleCalendar:
 
 
     def to_datetime(self, isoDatetime, localTZ) -> dt.datetime:
-        # replace Z with +00:00 is a workaround until datetime library decides what to do with the Z notation
-        toDatetime = dt.datetime.fromisoformat(isoDatetime.replace("Z", "+00:00"))
-        return toDatetime.astimezone(localTZ)
+        # Memoized, converted through the zone's transition table, see gcal/timestamps.py
+        return timestamps.to_local(isoDatetime, localTZ)
 
     def is_recently_updated(self, updatedTime: dt.datetime, thresholdHours: int) -> bool:
         # consider events updated within the past X hours as recently updated
@@ -149,10 +235,8 @@ class GoogleCalendar:
         check if end time is at 00:00 of next day, if so set to max time for day before
         """
         if endTime.hour == 0 and endTime.minute == 0 and endTime.second == 0:
-            newEndtime: dt.datetime = localTZ.localize(
-                dt.datetime.combine(
-                    endTime.date() - dt.timedelta(days=1), dt.datetime.max.time()
-                )
+            newEndtime: dt.datetime = timestamps.get_end_of_day(
+                endTime.date() - dt.timedelta(days=1), localTZ
             )
             return newEndtime
         else:
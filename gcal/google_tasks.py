@@ -1,21 +1,34 @@
 import logging
 import pathlib
+import threading
 
 import datetime as dt
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterator, List, Optional
 from pytz.tzinfo import DstTzInfo
 
+from gcal import timestamps
+from gcal.fields import get_list_fields
 from gcal.inkal_task import InkalTask
 from gcal.typings_google_task import GoogleTask
 
+# Task fields to_inkal_task reads, the list requests ask for nothing else
+TASK_FIELDS = ("title", "due", "completed", "updated")
+
 
 class GoogleTasks:
     """Google Tasks API"""
 
-    def __init__(self, task_service):
+    def __init__(self, task_service, http_factory: Optional[Callable[[], Any]] = None, max_workers: int = 4):
+        """
+        http_factory creates the HTTP object each fetch thread executes its requests with, httplib2 objects
+        are not thread safe. By default it authorizes a new one with the service's credentials.
+        """
         self.logger = logging.getLogger("maginkcal")
         self.currPath = str(pathlib.Path(__file__).parent.absolute())
         self.task_service = task_service
+        self.http_factory = http_factory or self.get_default_http_factory()
+        self.max_workers = max_workers
 
     def retrieve_tasks(
             self,
@@ -24,32 +37,79 @@ class GoogleTasks:
             localTZ: DstTzInfo,
             thresholdHours: int,
     ) -> List[InkalTask]:
-        taskList: List[InkalTask] = []
-
-        minTimeStr: str = startDatetime.isoformat()
-        maxTimeStr: str = endDatetime.isoformat()
+        return list(self.iter_inkal_tasks(startDatetime, endDatetime, localTZ, thresholdHours))
 
-        # There will only be one task list
-        task_lists = self.task_service.tasklists().list(maxResults=10).execute().get('items', [])
+    def iter_inkal_tasks(
+            self,
+            startDatetime: dt.datetime,
+            endDatetime: dt.datetime,
+            localTZ: DstTzInfo,
+            thresholdHours: int,
+    ) -> Iterator[InkalTask]:
+        """
+        Yields the converted tasks while the remaining pages are still being fetched
+        """
+        for google_task in self.iter_google_tasks(startDatetime.isoformat(), endDatetime.isoformat()):
+            yield self.to_inkal_task(google_task, localTZ, thresholdHours)
 
-        # For each task list, get the tasks
-        google_tasks: List[GoogleTask] = []
-        for task_list in task_lists:
-            tasks = self.task_service.tasks().list(
-                tasklist=task_list['id'],
+    def iter_google_tasks(self, minTimeStr: str, maxTimeStr: str) -> Iterator[GoogleTask]:
+        """
+        Fetches the task lists and the tasks of every list concurrently, following nextPageToken of both.
+        Each list is requested as soon as the page naming it arrives.
+        """
+        local = threading.local()
+
+        def execute(request):
+            if not hasattr(local, "http"):
+                local.http = self.http_factory()
+            return request.execute(http=local.http)
+
+        def fetch_lists(pageToken: Optional[str]):
+            request = self.task_service.tasklists().list(
+                maxResults=100,
+                fields=get_list_fields(("id",)),
+                pageToken=pageToken,
+            )
+            return None, execute(request)
+
+        def fetch_tasks(tasklist: str, pageToken: Optional[str]):
+            # Same filters as the API defaults, sent explicitly so the server does the filtering
+            request = self.task_service.tasks().list(
+                tasklist=tasklist,
                 dueMin=minTimeStr,
                 dueMax=maxTimeStr,
-                ).execute()
-            google_tasks.extend(tasks.get('items', []))
-
-        # Convert Google Tasks to Inkal Tasks
-        for google_task in google_tasks:
-            inkal_task = self.to_inkal_task(google_task, localTZ, thresholdHours)
+                showCompleted=True,
+                showHidden=False,
+                showDeleted=False,
+                maxResults=100,
+                fields=get_list_fields(TASK_FIELDS),
+                pageToken=pageToken,
+            )
+            return tasklist, execute(request)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = {executor.submit(fetch_lists, None)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    tasklist, page = future.result()
+                    if tasklist is None:
+                        if page.get("nextPageToken"):
+                            pending.add(executor.submit(fetch_lists, page["nextPageToken"]))
+                        for task_list in page.get("items", []):
+                            pending.add(executor.submit(fetch_tasks, task_list["id"], None))
+                    else:
+                        if page.get("nextPageToken"):
+                            pending.add(executor.submit(fetch_tasks, tasklist, page["nextPageToken"]))
+                        yield from page.get("items", [])
+
+    def get_default_http_factory(self) -> Callable[[], Any]:
+        from google_auth_httplib2 import AuthorizedHttp
+        import httplib2
+
+        credentials = getattr(getattr(self.task_service, "_http", None), "credentials", None)
+        return lambda: AuthorizedHttp(credentials, http=httplib2.Http())
 
-            taskList.append(inkal_task)
-
-        return taskList
-    
     def to_inkal_task(self, google_task, localTZ: dt.datetime, thresholdHours: dt.datetime) -> InkalTask:
         """
         Convert a Google Task to an InkalTask
@@ -73,13 +133,12 @@ class GoogleTasks:
     
     def to_date(self, isoDate: str) -> dt.date:
         if isoDate:
-            return dt.datetime.fromisoformat(isoDate).date()
+            return timestamps.parse_iso(isoDate).date()
         return None
     
     def to_datetime(self, isoDatetime, localTZ) -> dt.datetime:
-        # replace Z with +00:00 is a workaround until datetime library decides what to do with the Z notation
-        toDatetime = dt.datetime.fromisoformat(isoDatetime.replace("Z", "+00:00"))
-        return toDatetime.astimezone(localTZ)
+        # Memoized, converted through the zone's transition table, see gcal/timestamps.py
+        return timestamps.to_local(isoDatetime, localTZ)
     
     def is_recently_updated(self, updatedTime: dt.datetime, thresholdHours: int) -> bool:
         # consider events updated within the past X hours as recently updated
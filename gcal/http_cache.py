@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent response cache for the Apps Script endpoint.
+
+Every response body is kept gzip compressed on disk together with its validators (ETag, Last-Modified) and a
+content hash. Within the TTL the cached body is used without a request; afterwards the request is conditional,
+so an unchanged backend answers 304 without a body. When the backend does not send validators the content hash
+still tells whether the payload changed. If the request fails, the last good payload is served (stale-while-error).
+
+Requests go through one keep-alive session and are bounded by a total time budget: every attempt gets connect and
+read timeouts clipped to the remaining budget, the body is read against the same deadline, and connection errors,
+timeouts and 429/5xx answers are retried with jittered exponential backoff while the budget allows.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import random
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_CACHE_DIR = str(pathlib.Path.home() / '.cache' / 'inkal' / 'http')
+DEFAULT_TTL_S = 60
+DEFAULT_BUDGET_S = 30
+CONNECT_TIMEOUT_S = 5
+READ_TIMEOUT_S = 20
+RETRIES = 3
+BACKOFF_BASE_S = 0.5
+BACKOFF_CAP_S = 8
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class HttpCache:
+    """
+    Conditional GET with an on-disk cache, one entry per URL and query parameters.
+
+    After get_json, status tells where the payload came from:
+    'cached' (within TTL, no request), 'not-modified' (304), 'unchanged' (200 with the cached content hash),
+    'fetched' (new payload) or 'stale' (request failed, last good payload).
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL_S,
+                 budget: float = DEFAULT_BUDGET_S, read_timeout: float = READ_TIMEOUT_S, retries: int = RETRIES):
+        self.logger = logging.getLogger('maginkcal')
+        self.directory = directory
+        self.ttl = ttl
+        self.budget = budget
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.status: Optional[str] = None
+        os.makedirs(directory, exist_ok=True)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get_json(self, url: str, params: Optional[Dict[str, str]] = None, budget: Optional[float] = None) -> Any:
+        """
+        Returns the parsed JSON payload, within budget seconds (default: the cache's budget)
+        """
+        deadline = time.monotonic() + (self.budget if budget is None else budget)
+        key = self.get_key(url, params)
+        entry = self.read_entry(key)
+        if entry is not None and time.time() - entry['fetched'] < self.ttl:
+            self.status = 'cached'
+            return json.loads(self.read_body(key))
+
+        headers = {'Accept-Encoding': 'gzip'}
+        if entry is not None:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response, body = self.request(url, params, headers, deadline)
+            if response.status_code == 304 and entry is not None:
+                self.status = 'not-modified'
+                data = json.loads(self.read_body(key))
+            else:
+                response.raise_for_status()
+                data = json.loads(body)
+                content_hash = hashlib.sha256(body).hexdigest()
+                self.status = 'unchanged' if entry is not None and entry['hash'] == content_hash else 'fetched'
+                entry = {
+                    'url': url,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'hash': content_hash,
+                }
+                if self.status == 'fetched':
+                    self.write_atomic(os.path.join(self.directory, key + '.json.gz'), gzip.compress(body))
+        except (requests.RequestException, ValueError) as e:
+            if entry is None:
+                raise
+            self.logger.warning(f'Request to {url} failed ({e}), using the payload cached at '
+                                f'{time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry["fetched"]))}.')
+            self.status = 'stale'
+            return json.loads(self.read_body(key))
+
+        entry['fetched'] = time.time()
+        self.write_atomic(os.path.join(self.directory, key + '.meta.json'), json.dumps(entry).encode())
+        return data
+
+    def get_key(self, url: str, params: Optional[Dict[str, str]]) -> str:
+        return hashlib.sha256(json.dumps([url, params or {}], sort_keys=True).encode()).hexdigest()
+
+    def request(self, url: str, params: Optional[Dict[str, str]], headers: Dict[str, str],
+                deadline: float) -> Tuple[requests.Response, bytes]:
+        """
+        GET with retries, never running past deadline
+        """
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise requests.Timeout(f'Fetch budget used up after {attempt} attempts')
+            try:
+                response = self.session.get(
+                    url, params=params, headers=headers, stream=True,
+                    timeout=(min(CONNECT_TIMEOUT_S, remaining), min(self.read_timeout, remaining)),
+                )
+                if response.status_code in RETRY_STATUS:
+                    response.close()
+                    raise requests.HTTPError(f'{response.status_code} from {url}', response=response)
+                return response, self.read_content(response, deadline)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                delay = min(BACKOFF_CAP_S, BACKOFF_BASE_S * 2 ** attempt) * random.uniform(0.5, 1.0)
+                if attempt >= self.retries or time.monotonic() + delay >= deadline:
+                    raise
+                attempt += 1
+                self.logger.info(f'Request to {url} failed ({e}), retry {attempt} in {delay:.1f} s.')
+                time.sleep(delay)
+
+    def read_content(self, response: requests.Response, deadline: float) -> bytes:
+        """
+        Reads the (decompressed) body, a trickling server can not stretch the read past the deadline
+        """
+        chunks = []
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            chunks.append(chunk)
+            if time.monotonic() > deadline:
+                response.close()
+                raise requests.Timeout('Fetch budget used up while reading the response')
+        return b''.join(chunks)
+
+    def read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.directory, key + '.meta.json')) as file:
+                entry = json.load(file)
+            if not os.path.exists(os.path.join(self.directory, key + '.json.gz')):
+                return None
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def read_body(self, key: str) -> bytes:
+        with open(os.path.join(self.directory, key + '.json.gz'), 'rb') as file:
+            return gzip.decompress(file.read())
+
+    def write_atomic(self, path: str, content: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,205 @@
+"""
+Compact, immutable event and task records.
+
+InkalEventRecord and InkalTaskRecord keep their fields in __slots__ instead of a per item dict, but read like the
+InkalEvent / InkalTask dicts (record['summary'], record.get('due'), 'due' in record), so the renderers do not care
+which one they get. Fields that were never set are missing, as with the total=False TypedDicts.
+
+EventColumns / TaskColumns hold a whole window column by column, one list per field instead of one dict per item.
+The timestamps stay datetime objects: gcal/timestamps.py already shares one object per distinct string, so int64
+epoch columns saved next to nothing and made every read build a new datetime. Iterating or indexing the stores
+yields RowView pairs of (store, index) that read like the dicts as well, get_record copies a row out into a record.
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Marks an unset field in the columns
+MISSING = object()
+
+
+class Record(Mapping):
+    """
+    Read-only mapping over __slots__
+    """
+
+    __slots__ = ()
+
+    def __init__(self, values: Optional[Mapping] = None, **kwargs: Any):
+        if values is not None:
+            kwargs = {**values, **kwargs}
+        for key, value in kwargs.items():
+            try:
+                object.__setattr__(self, key, value)
+            except AttributeError:
+                raise KeyError(f'{type(self).__name__} has no field {key!r}') from None
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self.__slots__ if hasattr(self, key))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __setattr__(self, key: str, value: Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({dict(self)!r})'
+
+
+class InkalEventRecord(Record):
+    __slots__ = ('kind', 'location', 'account', 'allday', 'isMultiday', 'isUpdated', 'summary',
+                 'updatedDatetime', 'startDatetime', 'endDatetime')
+
+
+class InkalTaskRecord(Record):
+    __slots__ = ('kind', 'account', 'due', 'title', 'updated', 'updatedDatetime', 'isUpdated', 'isCompleted')
+
+
+class RowView(tuple):
+    """
+    Read-only mapping over one row of a Columns store, a (store, index) pair
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str) -> Any:
+        store, index = tuple.__iter__(self)
+        try:
+            value = store.get_value(key, index)
+        except KeyError:
+            raise KeyError(key) from None
+        if value is MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key, MISSING) is not MISSING
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self.store.columns if key in self)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def keys(self):
+        return Mapping.keys(self)
+
+    def items(self):
+        return Mapping.items(self)
+
+    def values(self):
+        return Mapping.values(self)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Mapping) and dict(self.items()) == dict(other.items())
+
+    __hash__ = None
+
+    @property
+    def store(self) -> 'Columns':
+        return tuple.__getitem__(self, 0)
+
+    def __reduce__(self):
+        store, index = tuple.__iter__(self)
+        return store.record_type, (dict(self.items()),)
+
+    def __repr__(self) -> str:
+        return f'{self.store.record_type.__name__}({dict(self.items())!r})'
+
+
+Mapping.register(RowView)
+
+
+class Columns(Sequence):
+    """
+    Column store for records of one type. Fill it a column at a time with from_columns, or append records.
+    """
+
+    record_type = Record
+
+    def __init__(self, records: Iterable[Mapping] = ()):
+        self.length = 0
+        self.columns: Dict[str, List[Any]] = {key: [] for key in self.record_type.__slots__}
+        for record in records:
+            self.append(record)
+
+    @classmethod
+    def from_columns(cls, length: int, **columns: Iterable[Any]) -> 'Columns':
+        """
+        Builds the store from whole columns of length values, fields without a column are unset
+        """
+        store = cls()
+        for key in cls.record_type.__slots__:
+            values = columns.pop(key, None)
+            store.columns[key].extend([MISSING] * length if values is None else values)
+        if columns:
+            raise KeyError(f'{cls.record_type.__name__} has no fields {sorted(columns)}')
+        store.length = length
+        return store
+
+    def append(self, record: Mapping) -> None:
+        get = record.get
+        for key, column in self.columns.items():
+            column.append(get(key, MISSING))
+        self.length += 1
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('record index out of range')
+
+        return tuple.__new__(RowView, (self, index))
+
+    def __iter__(self) -> Iterator['RowView']:
+        new = tuple.__new__
+        return (new(RowView, (self, index)) for index in range(self.length))
+
+    def get_value(self, key: str, index: int) -> Any:
+        return self.columns[key][index]
+
+    def get_record(self, index: int) -> Record:
+        """
+        Copies one row out of the store
+        """
+        record = self.record_type.__new__(self.record_type)
+        for key in self.columns:
+            value = self.get_value(key, index)
+            if value is not MISSING:
+                object.__setattr__(record, key, value)
+        return record
+
+    def __reduce__(self):
+        return type(self), ([self.get_record(index) for index in range(self.length)],)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class EventColumns(Columns):
+    record_type = InkalEventRecord
+
+
+class TaskColumns(Columns):
+    record_type = InkalTaskRecord
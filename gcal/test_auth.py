@@ -0,0 +1,83 @@
+import datetime as dt
+import pickle
+import threading
+import time
+
+from google.auth.credentials import AnonymousCredentials
+
+from gcal.google_auth import AccountManager, GoogleAuth, utcnow
+
+
+class FakeCredentials(AnonymousCredentials):
+    def __init__(self, expiry):
+        super().__init__()
+        self.expiry = expiry
+        self.refresh_token = "refresh"
+        self.refreshed = threading.Event()
+
+    def refresh(self, request):
+        self.expiry = utcnow() + dt.timedelta(hours=1)
+        self.refreshed.set()
+
+
+class StoredCredentials(AnonymousCredentials):
+    def __init__(self, expiry):
+        super().__init__()
+        self.expiry = expiry
+        self.refresh_token = "refresh"
+        self.refreshes = 0
+
+    def refresh(self, request):
+        self.expiry = utcnow() + dt.timedelta(hours=1)
+        self.refreshes += 1
+
+
+class FakeAuth(GoogleAuth):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.saved = []
+
+    def load_credentials(self, account):
+        time.sleep(self.delay)
+        # The first account expires right away, the other one in an hour
+        minutes = 5 if account == "a" else 60
+        return FakeCredentials(utcnow() + dt.timedelta(minutes=minutes))
+
+    def save_credentials(self, account, creds):
+        self.saved.append(account)
+
+
+def test_authenticate_all() -> None:
+    """
+    Accounts are loaded in parallel and the token close to expiry is refreshed in the background
+    """
+    google_auth = FakeAuth(0.2)
+    manager = AccountManager(google_auth)
+
+    start = time.monotonic()
+    services = manager.authenticate_all(["a", "b", "c"])
+    assert time.monotonic() - start < 0.5
+    assert sorted(services) == ["a", "b", "c"]
+
+    assert manager.credentials["a"].refreshed.wait(2)
+    manager.stop()
+    assert google_auth.saved == ["a"]
+    assert not manager.credentials["b"].refreshed.is_set()
+
+
+def test_load_credentials_refreshes_early(tmp_path, monkeypatch) -> None:
+    """
+    Stored tokens expiring within REFRESH_MARGIN are refreshed before use, later ones are used as they are
+    """
+    google_auth = GoogleAuth()
+    saved = []
+    monkeypatch.setattr(google_auth, "get_token_path", lambda account: str(tmp_path / f"{account}.token.pickle"))
+    monkeypatch.setattr(google_auth, "save_credentials", lambda account, creds: saved.append(account))
+    for account, minutes in (("soon", 2), ("later", 60)):
+        with open(google_auth.get_token_path(account), "wb") as token:
+            pickle.dump(StoredCredentials(utcnow() + dt.timedelta(minutes=minutes)), token)
+
+    assert google_auth.load_credentials("soon").refreshes == 1
+    assert google_auth.load_credentials("later").refreshes == 0
+    assert saved == ["soon"]
@@ -1,6 +1,13 @@
+import datetime as dt
+import time
 from typing import List
+
+import httplib2
+from googleapiclient.errors import HttpError
+from pytz import timezone
 from typings_google_calendar_api.calendars import Calendar
 
+from gcal.calendar_sync import CalendarSync
 from gcal.google_calendar import GoogleCalendar
 
 
@@ -13,3 +20,153 @@ def test_get_calendars() -> None:
     calendars: List[Calendar] = googleCalendar.list_calendars()
     assert len(calendars) > 0
 
+
+class FakeRequest:
+    def __init__(self, pages, delay, calendarId, pageToken=None, **kwargs):
+        self.pages = pages
+        self.delay = delay
+        self.calendarId = calendarId
+        self.pageToken = pageToken
+
+    def execute(self, http=None):
+        assert http is not None
+        time.sleep(self.delay)
+        return self.pages[self.calendarId][int(self.pageToken or 0)]
+
+
+class FakeCalendarService:
+    def __init__(self, pages, delay):
+        self.pages = pages
+        self.delay = delay
+
+    def events(self):
+        return self
+
+    def list(self, **kwargs):
+        return FakeRequest(self.pages, self.delay, **kwargs)
+
+
+def test_retrieve_events_concurrent() -> None:
+    """
+    All pages of all calendars are fetched, calendars in parallel
+    """
+    tz = timezone("Europe/Berlin")
+
+    def event(summary, day):
+        return {
+            "summary": summary,
+            "start": {"date": f"2026-01-{day:02d}"},
+            "end": {"date": f"2026-01-{day + 1:02d}"},
+            "updated": "2026-01-01T10:00:00.000Z",
+        }
+
+    pages = {
+        cal: [
+            {"items": [event(f"{cal}-1", 10)], "nextPageToken": "1"},
+            {"items": [event(f"{cal}-2", 5)]},
+        ]
+        for cal in ("a", "b", "c", "d")
+    }
+    googleCalendar = GoogleCalendar(FakeCalendarService(pages, 0.2), http_factory=object)
+
+    start = time.monotonic()
+    events = googleCalendar.retrieve_events(
+        list(pages), tz.localize(dt.datetime(2026, 1, 1)), tz.localize(dt.datetime(2026, 1, 28)), tz, 24
+    )
+    elapsed = time.monotonic() - start
+
+    assert sorted(event["summary"] for event in events) == sorted(f"{cal}-{page}" for cal in pages for page in (1, 2))
+    assert [event["startDatetime"].day for event in events] == [5] * 4 + [10] * 4
+    assert elapsed < 0.7
+
+
+class FakeSyncService:
+    def __init__(self, items):
+        self.items = items
+        self.changes = []
+        self.token = 0
+        self.calls = []
+
+    def events(self):
+        return self
+
+    def list(self, **kwargs):
+        self.calls.append(kwargs)
+        return self
+
+    def execute(self, http=None):
+        params = self.calls[-1]
+        if "syncToken" in params:
+            if params["syncToken"] != str(self.token):
+                raise HttpError(httplib2.Response({"status": 410}), b"")
+            items, self.changes = self.changes, []
+        else:
+            assert params["timeMin"] and params["timeMax"]
+            items = list(self.items.values())
+        self.token += 1
+        return {"items": items, "nextSyncToken": str(self.token)}
+
+
+def test_retrieve_events_incremental(tmp_path) -> None:
+    """
+    Later runs only apply the changes, an expired sync token falls back to a full listing
+    """
+    tz = timezone("Europe/Berlin")
+
+    def event(event_id, summary, day, status="confirmed"):
+        return {
+            "id": event_id,
+            "status": status,
+            "summary": summary,
+            "start": {"dateTime": f"2026-01-{day:02d}T09:00:00+01:00"},
+            "end": {"dateTime": f"2026-01-{day:02d}T10:00:00+01:00"},
+            "updated": "2026-01-01T10:00:00.000Z",
+        }
+
+    service = FakeSyncService({"1": event("1", "one", 5), "2": event("2", "two", 6)})
+    googleCalendar = GoogleCalendar(service, http_factory=object, sync_dir=str(tmp_path))
+
+    def summaries():
+        events = googleCalendar.retrieve_events(
+            ["a"], tz.localize(dt.datetime(2026, 1, 1)), tz.localize(dt.datetime(2026, 1, 28)), tz, 24
+        )
+        return [event["summary"] for event in events]
+
+    assert summaries() == ["one", "two"]
+
+    service.changes = [event("2", None, 6, status="cancelled"), event("3", "three", 3), event("1", "uno", 5)]
+    assert summaries() == ["three", "uno"]
+    assert service.calls[-1]["syncToken"] == "1"
+    assert "timeMin" not in service.calls[-1]
+
+    service.token = 10
+    assert summaries() == ["one", "two"]
+    assert "timeMin" in service.calls[-1]
+
+
+def test_calendar_sync_prunes_past_events(tmp_path) -> None:
+    """
+    Merging the changes drops the events that ended before the requested window
+    """
+    tz = timezone("Europe/Berlin")
+    service = FakeSyncService({
+        "1": {"id": "1", "summary": "past", "start": {"date": "2026-01-01"}, "end": {"date": "2026-01-02"}},
+        "2": {"id": "2", "summary": "yesterday", "start": {"dateTime": "2026-01-02T09:00:00+01:00"},
+              "end": {"dateTime": "2026-01-02T10:00:00+01:00"}},
+        "3": {"id": "3", "summary": "ongoing", "start": {"dateTime": "2026-01-02T09:00:00+01:00"},
+              "end": {"dateTime": "2026-01-04T10:00:00+01:00"}},
+    })
+    calendarSync = CalendarSync(str(tmp_path))
+
+    def sync(day):
+        minTime = tz.localize(dt.datetime(2026, 1, day))
+        events = calendarSync.sync("a", lambda **params: service.list(**params).execute(),
+                                   minTime, minTime + dt.timedelta(days=28))
+        return sorted(event["summary"] for event in events)
+
+    assert sync(1) == ["ongoing", "past", "yesterday"]
+    assert sync(3) == ["ongoing"]
+    assert "syncToken" in service.calls[-1]
+    store = calendarSync.load("a")
+    assert sorted(store["events"]) == ["3"]
+    assert store["timeMin"] == tz.localize(dt.datetime(2026, 1, 3)).timestamp()
@@ -0,0 +1,68 @@
+from google.auth.credentials import AnonymousCredentials
+from pytz import timezone
+
+from gcal.fields import get_list_fields
+from gcal.google_auth import GoogleAuth
+from gcal.google_calendar import CALENDAR_FIELDS, EVENT_FIELDS, SYNC_EVENT_FIELDS, GoogleCalendar
+from gcal.google_tasks import TASK_FIELDS, GoogleTasks
+
+
+class RecordingDict(dict):
+    """
+    Records the top level keys a converter reads
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.read = set()
+
+    def __getitem__(self, key):
+        self.read.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.read.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.read.add(key)
+        return super().__contains__(key)
+
+
+def test_converters_read_masked_fields_only() -> None:
+    """
+    Fails when a converter starts reading a field the requests do not ask for
+    """
+    tz = timezone("Europe/Berlin")
+    updated = "2026-01-01T10:00:00.000Z"
+    googleCalendar = GoogleCalendar(None, http_factory=object)
+    for start, end in (
+        ({"date": "2026-01-05"}, {"date": "2026-01-06"}),
+        ({"dateTime": "2026-01-05T09:00:00+01:00"}, {"dateTime": "2026-01-05T10:00:00+01:00"}),
+    ):
+        event = RecordingDict(summary="event", start=start, end=end, updated=updated)
+        googleCalendar.to_inkal_event(event, tz, 24)
+        assert event.read <= set(EVENT_FIELDS)
+    assert set(EVENT_FIELDS) <= set(SYNC_EVENT_FIELDS)
+
+    googleTasks = GoogleTasks(None, http_factory=object)
+    for task in (
+        RecordingDict(title="task", updated=updated),
+        RecordingDict(title="task", due="2026-01-05T00:00:00.000Z", completed=updated, updated=updated),
+    ):
+        googleTasks.to_inkal_task(task, tz, 24)
+        assert task.read <= set(TASK_FIELDS)
+
+
+def test_fields_mask_is_sent_gzipped() -> None:
+    """
+    The masks are valid for the API clients and the responses are requested gzip compressed
+    """
+    calendar_service, task_service = GoogleAuth().build_services(AnonymousCredentials())
+    request = calendar_service.events().list(calendarId="primary", fields=get_list_fields(EVENT_FIELDS))
+    assert "fields=items%28summary%2Cstart%2Cend%2Cupdated%29%2CnextPageToken" in request.uri
+    assert "gzip" in request.headers["accept-encoding"] and "(gzip)" in request.headers["user-agent"]
+    request = calendar_service.calendarList().list(fields=get_list_fields(CALENDAR_FIELDS))
+    assert "fields=items%28id%2Csummary%29%2CnextPageToken" in request.uri
+    request = task_service.tasks().list(tasklist="list", fields=get_list_fields(TASK_FIELDS))
+    assert "fields=" in request.uri
@@ -0,0 +1,96 @@
+import gzip
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import requests
+
+from gcal.http_cache import HttpCache
+
+
+class Backend(BaseHTTPRequestHandler):
+    payload = {'calendars': [], 'tasks': []}
+    etag = None
+    requests = 0
+
+    def do_GET(self):
+        Backend.requests += 1
+        if Backend.etag and self.headers.get('If-None-Match') == Backend.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(Backend.payload).encode()
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_header('Content-Encoding', 'gzip')
+        if Backend.etag:
+            self.send_header('ETag', Backend.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_http_cache(tmp_path):
+    """
+    TTL hits skip the request, validators and content hashes detect unchanged payloads, failures serve stale data
+    """
+    server = HTTPServer(('127.0.0.1', 0), Backend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/exec'
+    try:
+        cache = HttpCache(str(tmp_path), ttl=60)
+        assert cache.get_json(url, {'key': 'k'}) == Backend.payload
+        assert cache.status == 'fetched'
+        assert cache.get_json(url, {'key': 'k'}) == Backend.payload
+        assert (cache.status, Backend.requests) == ('cached', 1)
+
+        cache.ttl = 0
+        cache.get_json(url, {'key': 'k'})
+        assert cache.status == 'unchanged'
+
+        Backend.etag = '"v1"'
+        cache.get_json(url, {'key': 'k'})
+        assert cache.status == 'unchanged'
+        cache.get_json(url, {'key': 'k'})
+        assert cache.status == 'not-modified'
+
+        Backend.payload = {'calendars': [{'id': 'a'}], 'tasks': []}
+        Backend.etag = '"v2"'
+        assert cache.get_json(url, {'key': 'k'}) == Backend.payload
+        assert cache.status == 'fetched'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert cache.get_json(url, {'key': 'k'}, budget=1) == Backend.payload
+    assert cache.status == 'stale'
+    with pytest.raises(requests.RequestException):
+        cache.get_json(url, {'key': 'other'}, budget=1)
+
+
+def test_http_cache_budget(tmp_path):
+    """
+    Failing attempts are retried, a backend that never answers costs at most the budget before stale data is used
+    """
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen()
+    url = f'http://127.0.0.1:{listener.getsockname()[1]}/exec'
+    cache = HttpCache(str(tmp_path), ttl=0)
+    cache.write_atomic(str(tmp_path / (cache.get_key(url, None) + '.json.gz')), gzip.compress(b'{"tasks": []}'))
+    cache.write_atomic(str(tmp_path / (cache.get_key(url, None) + '.meta.json')), b'{"fetched": 0, "hash": ""}')
+    try:
+        start = time.monotonic()
+        # Accepted but never answered, every attempt runs into the clipped read timeout
+        assert cache.get_json(url, budget=1.5) == {'tasks': []}
+        assert cache.status == 'stale'
+        assert time.monotonic() - start < 2
+    finally:
+        listener.close()
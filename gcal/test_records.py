@@ -0,0 +1,56 @@
+import datetime as dt
+import pickle
+
+import pytest
+from pytz import timezone
+
+from gcal.converter import Converter
+from gcal.records import EventColumns, InkalEventRecord, TaskColumns
+
+
+def test_records_read_like_dicts() -> None:
+    """
+    Records and column rows answer the same lookups as the dicts they replace
+    """
+    tz = timezone('Europe/Berlin')
+    event = {
+        'kind': 'calendar#event',
+        'summary': 'event',
+        'allday': False,
+        'startDatetime': tz.localize(dt.datetime(2026, 3, 29, 1, 30)),
+        'endDatetime': tz.localize(dt.datetime(2026, 3, 29, 3, 30)),
+        'updatedDatetime': None,
+    }
+    record = InkalEventRecord(event)
+    assert dict(record) == event and record['summary'] == 'event'
+    assert record.get('location') is None and 'location' not in record
+    with pytest.raises(KeyError):
+        record['isMultiday']
+    with pytest.raises(AttributeError):
+        record.summary = 'changed'
+    assert pickle.loads(pickle.dumps(record)) == record
+
+    columns = EventColumns([event, {'kind': 'calendar#event'}])
+    assert len(columns) == 2
+    assert dict(columns[0]) == event and columns[-1] == {'kind': 'calendar#event'}
+    assert columns[0]['endDatetime'] is event['endDatetime']
+    assert 'updatedDatetime' in columns[0] and 'updatedDatetime' not in columns[1]
+    assert [dict(row) for row in pickle.loads(pickle.dumps(columns))] == [event, {'kind': 'calendar#event'}]
+
+
+def test_converter_columns() -> None:
+    """
+    Converted Apps Script items are stored column-wise
+    """
+    events = Converter.to_inkal_events([
+        {'title': 'allday', 'start': '2026-01-05T00:00:00.000Z', 'end': '2026-01-06T00:00:00.000Z'},
+        {'title': 'broken', 'start': 'soon'},
+    ])
+    assert isinstance(events, EventColumns)
+    assert [(event['summary'], event['allday'], event['isMultiday']) for event in events] == \
+        [('allday', True, True), ('broken', False, False)]
+    assert events[1]['startDatetime'] is None
+
+    tasks = Converter.to_inkal_tasks([{'title': 'task', 'due': '2026-01-05T00:00:00.000Z', 'status': 'completed'}])
+    assert isinstance(tasks, TaskColumns)
+    assert tasks[0]['due'] == dt.date(2026, 1, 5) and tasks[0]['isCompleted']
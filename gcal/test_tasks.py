@@ -0,0 +1,70 @@
+import datetime as dt
+import time
+
+from pytz import timezone
+
+from gcal.google_tasks import GoogleTasks
+
+
+class FakeRequest:
+    def __init__(self, response, delay):
+        self.response = response
+        self.delay = delay
+
+    def execute(self, http=None):
+        assert http is not None
+        time.sleep(self.delay)
+        return self.response
+
+
+class FakeTaskService:
+    def __init__(self, lists, delay):
+        self.lists = lists
+        self.delay = delay
+        self.calls = []
+
+    def tasklists(self):
+        return self
+
+    def tasks(self):
+        return self
+
+    def list(self, tasklist=None, pageToken=None, **kwargs):
+        self.calls.append(kwargs)
+        page = int(pageToken or 0)
+        if tasklist is None:
+            ids = sorted(self.lists)
+            response = {"items": [{"id": ids[page * 2]}, {"id": ids[page * 2 + 1]}]}
+            if page * 2 + 2 < len(ids):
+                response["nextPageToken"] = str(page + 1)
+        else:
+            response = {"items": self.lists[tasklist][page]}
+            if page + 1 < len(self.lists[tasklist]):
+                response["nextPageToken"] = str(page + 1)
+        return FakeRequest(response, self.delay)
+
+
+def test_retrieve_tasks_concurrent() -> None:
+    """
+    All pages of all task lists are fetched, lists in parallel, with the filters sent to the server
+    """
+    tz = timezone("Europe/Berlin")
+
+    def task(title):
+        return {"title": title, "due": "2026-01-05T00:00:00.000Z", "updated": "2026-01-01T10:00:00.000Z"}
+
+    lists = {name: [[task(f"{name}-1")], [task(f"{name}-2")]] for name in ("a", "b", "c", "d")}
+    service = FakeTaskService(lists, 0.1)
+    googleTasks = GoogleTasks(service, http_factory=object)
+
+    start = time.monotonic()
+    tasks = googleTasks.retrieve_tasks(
+        tz.localize(dt.datetime(2026, 1, 1)), tz.localize(dt.datetime(2026, 1, 28)), tz, 24
+    )
+    elapsed = time.monotonic() - start
+
+    assert sorted(task["title"] for task in tasks) == sorted(f"{name}-{page}" for name in lists for page in (1, 2))
+    assert all(task["due"] == dt.date(2026, 1, 5) and not task["isCompleted"] for task in tasks)
+    # Two pages of lists, then two pages of tasks: 4 rounds instead of 10 requests in a row
+    assert elapsed < 0.7
+    assert all(call["showHidden"] is False and "fields" in call for call in service.calls if "dueMin" in call)
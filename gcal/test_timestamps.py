@@ -0,0 +1,40 @@
+import datetime as dt
+
+from pytz import timezone
+
+from gcal import timestamps
+
+
+def reference(value, tz):
+    return dt.datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(tz)
+
+
+def test_to_local_matches_astimezone() -> None:
+    """
+    Same instant, wall time and tzinfo as astimezone, every 10 minutes around the DST changes
+    """
+    for name in ("Europe/Berlin", "America/New_York", "Australia/Lord_Howe", "Asia/Kolkata"):
+        tz = timezone(name)
+        for start in (dt.datetime(2026, 3, 27), dt.datetime(2026, 10, 23), dt.datetime(2026, 4, 3)):
+            for minutes in range(0, 4 * 24 * 60, 10):
+                utc = start + dt.timedelta(minutes=minutes, seconds=7, microseconds=5000)
+                for value in (utc.isoformat(timespec="milliseconds") + "Z", utc.isoformat() + "+00:00",
+                              (utc + dt.timedelta(hours=1)).isoformat() + "+01:00"):
+                    converted = timestamps.to_local(value, tz)
+                    expected = reference(value, tz)
+                    assert converted == expected
+                    assert converted.replace(tzinfo=None) == expected.replace(tzinfo=None)
+                    assert converted.tzinfo is expected.tzinfo, (name, value)
+
+
+def test_parse_iso() -> None:
+    """
+    Dates, Z and offsets, malformed values are None for parse_optional
+    """
+    assert timestamps.parse_iso("2026-01-05") == dt.datetime(2026, 1, 5)
+    assert timestamps.parse_iso("2026-01-05T10:00:00.000Z") == dt.datetime(2026, 1, 5, 10, tzinfo=dt.timezone.utc)
+    assert timestamps.parse_iso("2026-01-05T10:00:00+01:00").utcoffset() == dt.timedelta(hours=1)
+    assert timestamps.parse_optional("soon") is None and timestamps.parse_optional(None) is None
+    tz = timezone("Europe/Berlin")
+    assert timestamps.to_local("2026-01-05", tz) == dt.datetime(2026, 1, 5).astimezone(tz)
+    assert timestamps.get_end_of_day(dt.date(2026, 3, 29), tz).utcoffset() == dt.timedelta(hours=2)
@@ -0,0 +1,117 @@
+"""
+Timestamp parsing shared by the Calendar, Tasks and Apps Script converters.
+
+Google sends RFC 3339 timestamps ('2026-01-05T09:00:00+01:00', '2026-01-01T10:00:00.000Z') and all-day dates
+('2026-01-05'); the parsed values are memoized, all-day events and recurring instances repeat the same strings
+many times. Conversion to the display time zone looks the UTC offset up in a table of the zone's transitions,
+built once per zone and BUCKET_DAYS span, instead of going through pytz for every timestamp. The results are the
+same as datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(tz).
+"""
+
+import bisect
+import datetime as dt
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+UTC = dt.timezone.utc
+# Span of one transition table in days, a 28 day window touches at most two
+BUCKET_DAYS = 28
+# The zone is sampled this often, it never changes its offset twice within it
+SAMPLE = dt.timedelta(hours=1)
+# Distinct strings kept per cache, a 28 day window of a busy household stays well below
+CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_iso(value: str) -> dt.datetime:
+    """
+    -> datetime of an RFC 3339 timestamp or ISO date (naive midnight), raises ValueError otherwise
+    """
+    try:
+        return dt.datetime.fromisoformat(value)
+    except ValueError:
+        if not value.endswith('Z'):
+            raise
+        # fromisoformat only understands Z from Python 3.11 on
+        return dt.datetime.fromisoformat(value[:-1] + '+00:00')
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def to_local(value: str, tz: dt.tzinfo) -> dt.datetime:
+    """
+    Parses value and converts it to tz, naive values (dates) are taken as system local time like astimezone does
+    """
+    parsed = parse_iso.__wrapped__(value)
+    if parsed.tzinfo is None:
+        return parsed.astimezone(tz)
+    return convert(parsed, tz)
+
+
+def convert(value: dt.datetime, tz: dt.tzinfo) -> dt.datetime:
+    """
+    value.astimezone(tz) for an aware value, through the transition table for pytz zones
+    """
+    if not hasattr(tz, 'localize'):
+        # zoneinfo and friends mark ambiguous local times with fold, leave them to the standard library
+        return value.astimezone(tz)
+    utc = value if value.tzinfo is UTC else value.astimezone(UTC)
+    starts, periods = get_transitions(tz, utc.toordinal() // BUCKET_DAYS)
+    offset, tzinfo = periods[bisect.bisect_right(starts, utc) - 1]
+    # The constructor is several times faster than datetime.replace
+    local = utc + offset
+    return dt.datetime(local.year, local.month, local.day, local.hour, local.minute, local.second,
+                       local.microsecond, tzinfo)
+
+
+@lru_cache(maxsize=64)
+def get_transitions(tz: dt.tzinfo, bucket: int) -> Tuple[List[dt.datetime], List[Tuple[dt.timedelta, dt.tzinfo]]]:
+    """
+    -> (UTC starts, (UTC offset, tzinfo)) of the periods of tz within one bucket, the first at its start
+    """
+    start = dt.datetime.combine(dt.date.fromordinal(bucket * BUCKET_DAYS), dt.time(0), UTC)
+    end = start + dt.timedelta(days=BUCKET_DAYS)
+    starts = [start]
+    periods = [get_period(start, tz)]
+    previous = start
+    sample = start + SAMPLE
+    while sample <= end:
+        if get_period(sample, tz) != periods[-1]:
+            # Bisect to the second the new period starts
+            low, high = previous, sample
+            while high - low > dt.timedelta(seconds=1):
+                middle = low + (high - low) // 2
+                middle -= dt.timedelta(microseconds=middle.microsecond)
+                if get_period(middle, tz) == periods[-1]:
+                    low = middle
+                else:
+                    high = middle
+            starts.append(high)
+            periods.append(get_period(high, tz))
+        previous = sample
+        sample += SAMPLE
+    return starts, periods
+
+
+def get_period(utc: dt.datetime, tz: dt.tzinfo) -> Tuple[dt.timedelta, dt.tzinfo]:
+    local = utc.astimezone(tz)
+    return local.utcoffset(), local.tzinfo
+
+
+@lru_cache(maxsize=1024)
+def get_end_of_day(day: dt.date, tz: dt.tzinfo) -> dt.datetime:
+    """
+    -> the last microsecond of day in tz
+    """
+    return tz.localize(dt.datetime.combine(day, dt.datetime.max.time()))
+
+
+def parse_optional(value: Optional[str]) -> Optional[dt.datetime]:
+    """
+    None for a missing or malformed timestamp
+    """
+    if not value:
+        return None
+    try:
+        return parse_iso(value)
+    except ValueError:
+        return None
@@ -11,21 +11,23 @@ CSS stylesheets in the "render" folder.
 
 
 
-import requests
 from gcal.converter import Converter
+from gcal.http_cache import (
+    DEFAULT_BUDGET_S, DEFAULT_CACHE_DIR as DEFAULT_HTTP_CACHE_DIR, DEFAULT_TTL_S, READ_TIMEOUT_S, RETRIES, HttpCache
+)
 from pytz import timezone
 from pytz.tzinfo import DstTzInfo
 from display_data import DisplayData
 from render.render import ChromeRenderer
+from render.render_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, RenderCache
+from display.display_service import DEFAULT_SOCKET_PATH, PANEL_HEIGHT, PANEL_WIDTH, DisplayClient
+from display.epd_buffer import get_panel_rotation, pack_planes
+from display.framebuffer import DEFAULT_FRAMEBUFFER_PATH, FrameBufferWriter
 from power.pi_sugar import PiSugar
-from PIL import Image
 import datetime as dt
 import json
 import logging
 import sys
-import os
-
-image_dir = '/home/pi/inkal/render'
 
 
 
@@ -45,6 +47,21 @@ def main():
     imageWidth = config["imageWidth"]
     imageHeight = config["imageHeight"]
     rotateAngle = config["rotateAngle"]
+    debugImageDir = config.get("debugImageDir")
+    persistentBrowser = config.get("persistentBrowser", False)
+    renderBackend = config.get("renderBackend", "browser")
+    renderCacheDir = config.get("renderCacheDir", DEFAULT_CACHE_DIR)
+    renderCacheMaxBytes = config.get("renderCacheMaxBytes", DEFAULT_MAX_BYTES)
+    busyTimeoutSeconds = config.get("busyTimeoutSeconds", 60)
+    displayStatePath = config.get("displayStatePath", "display_state.json")
+    fastRefreshBudget = config.get("fastRefreshBudget", 0)
+    displaySocketPath = config.get("displaySocketPath", DEFAULT_SOCKET_PATH)
+    framebufferPath = config.get("framebufferPath", DEFAULT_FRAMEBUFFER_PATH)
+    httpCacheDir = config.get("httpCacheDir", DEFAULT_HTTP_CACHE_DIR)
+    httpCacheTtlSeconds = config.get("httpCacheTtlSeconds", DEFAULT_TTL_S)
+    fetchBudgetSeconds = config.get("fetchBudgetSeconds", DEFAULT_BUDGET_S)
+    fetchReadTimeoutSeconds = config.get("fetchReadTimeoutSeconds", READ_TIMEOUT_S)
+    fetchRetries = config.get("fetchRetries", RETRIES)
 
     # Create and configure logger
     logging.basicConfig(
@@ -71,10 +88,12 @@ def main():
         url = "https://script.google.com/macros/s/AKfycbxrWgy9ORGJmD8Mo7nu-iu3RGrq0BnGhIu7VWyvFF7yltVLr3hzTEIJnz7Rymx97Z_L/exec"
         params = {"key": "Klostergasse48"}
         logger.info(f"Fetching events and tasks from {url}")
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        data = response.json()
-        logger.info("Events and tasks fetched successfully")
+        # Bounded by fetchBudgetSeconds, falls back to the last good payload when the backend is slow or down
+        http_cache = HttpCache(
+            httpCacheDir, httpCacheTtlSeconds, fetchBudgetSeconds, fetchReadTimeoutSeconds, fetchRetries
+        )
+        data = http_cache.get_json(url, params)
+        logger.info(f"Events and tasks fetched successfully ({http_cache.status})")
 
         events = data.get("calendars", [])
         tasks = data.get("tasks", [])
@@ -91,25 +110,47 @@ def main():
             "tasks": Converter.to_inkal_tasks(tasks)
         }
 
-        renderer = ChromeRenderer(imageWidth, imageHeight, rotateAngle)
+        render_cache = RenderCache(renderCacheDir, renderCacheMaxBytes)
+        renderer = ChromeRenderer(
+            imageWidth, imageHeight, rotateAngle, debugImageDir, persistentBrowser, renderBackend, render_cache
+        )
         black_image, red_image = renderer.render(render_data)
     except Exception as e:
         logger.error(e)
+        return
 
     logger.info(msg="Data rendered in " + str(dt.datetime.now() - start))
 
-    from display.display import EInkDisplay
-
-    eInkDisplay = EInkDisplay(screenWidth, screenHeight)
+    # Packed once, the framebuffer file hands the planes to other processes without re-encoding
+    panelRotation = get_panel_rotation(rotateAngle, screenWidth, screenHeight, PANEL_WIDTH, PANEL_HEIGHT)
+    black_buf, red_buf = pack_planes(black_image, red_image, PANEL_WIDTH, PANEL_HEIGHT, panelRotation)
+    try:
+        frame_buffer = FrameBufferWriter(framebufferPath, PANEL_WIDTH, PANEL_HEIGHT)
+        frame_buffer.write_buffers(black_buf, red_buf)
+        frame_buffer.close()
+    except OSError as e:
+        logger.warning(f"Failed to write framebuffer {framebufferPath}: {e}")
+        framebufferPath = None
+
+    display_client = DisplayClient(displaySocketPath)
+    if display_client.is_available():
+        # The resident display service already owns the initialised panel
+        logger.info("Submitting frame to the display service")
+        if framebufferPath:
+            display_client.display_framebuffer(framebufferPath)
+        else:
+            display_client.display_buffers(black_buf, red_buf)
+    else:
+        from display.display import EInkDisplay
+
+        eInkDisplay = EInkDisplay(
+            screenWidth, screenHeight, busyTimeoutSeconds, displayStatePath, fastRefreshBudget
+        )
 
-    red_image_path = os.path.join(image_dir, 'red_image.png')
-    black_image_path = os.path.join(image_dir, 'black_image.png')
-    red_image = Image.open(red_image_path)
-    black_image = Image.open(black_image_path)
-    # if currDate.weekday() == 0:
-    #     eInkDisplay.calibrate(cycles=0)
-    eInkDisplay.display(black_image, red_image)
-    # eInkDisplay.sleep()
+        # if currDate.weekday() == 0:
+        #     eInkDisplay.calibrate(cycles=0)
+        eInkDisplay.display_buffers(black_buf, red_buf)
+        # eInkDisplay.sleep()
 
     pi_sugar = PiSugar()
     battery_level = pi_sugar.get_battery()
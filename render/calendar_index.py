@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Places events and tasks into the days of the calendar grid.
+
+Every event is added to each day it covers (clipped to the grid), so the middle days of long events show it too.
+Per day the entries are ordered all-day first (all-day events and days a multiday event spans completely), then
+timed events by start time, then tasks. Only the first maxEventsPerDay are kept, selected with a heap, the rest is
+counted in the day's overflow. The cost grows with the number of entries, not with their sort order or the days
+they lie outside the grid.
+"""
+
+import datetime as dt
+import heapq
+import itertools
+from typing import Iterable, List, Optional, Tuple
+
+from gcal.inkal_event import InkalEvent
+from gcal.inkal_task import InkalTask
+
+# Day ordering, lower first
+ALLDAY_RANK = 0
+TIMED_RANK = 1
+TASK_RANK = 2
+
+
+class DayEntries(list):
+    """
+    The shown entries of one day, overflow counts those that did not fit
+    """
+
+    def __init__(self, entries: Iterable[InkalEvent | InkalTask] = (), overflow: int = 0):
+        super().__init__(entries)
+        self.overflow = overflow
+
+
+class CalendarIndex:
+    """
+    Day buckets of the numDays days starting at startDate
+    """
+
+    def __init__(self, startDate: dt.date, numDays: int = 28):
+        self.startDate = startDate
+        self.numDays = numDays
+        self.buckets: List[List[Tuple]] = [[] for _ in range(numDays)]
+        # Ties keep the order the entries were added in
+        self.sequence = itertools.count()
+
+    def add_event(self, event: InkalEvent) -> None:
+        start: Optional[dt.datetime] = event.get('startDatetime')
+        if start is None:
+            return
+        end: dt.datetime = event.get('endDatetime') or start
+        first = (start.date() - self.startDate).days
+        last = (self.get_last_date(start, end) - self.startDate).days
+        for idx in range(max(first, 0), min(last, self.numDays - 1) + 1):
+            # A multiday event is an all-day item on the days it covers completely
+            allday = event.get('allday') or first < idx < last
+            rank = ALLDAY_RANK if allday else TIMED_RANK
+            sort_time = start if idx == first else None
+            self.push(idx, rank, sort_time, event)
+
+    def add_task(self, task: InkalTask) -> None:
+        due: Optional[dt.date] = task.get('due')
+        if due is None:
+            return
+        idx = (due - self.startDate).days
+        if 0 <= idx < self.numDays:
+            self.push(idx, TASK_RANK, None, task)
+
+    def push(self, idx: int, rank: int, sort_time: Optional[dt.datetime], entry: InkalEvent | InkalTask) -> None:
+        # Continued events have no start time on that day, they sort before the ones starting that day
+        time_key = (1, sort_time.timestamp()) if sort_time is not None else (0, 0.0)
+        self.buckets[idx].append((rank, time_key, next(self.sequence), entry))
+
+    def get_last_date(self, start: dt.datetime, end: dt.datetime) -> dt.date:
+        # An event ending at midnight does not cover the day it ends on
+        if end > start and end.time() == dt.time(0):
+            return end.date() - dt.timedelta(days=1)
+        return max(end.date(), start.date())
+
+    def get_days(self, maxEventsPerDay: int) -> List[DayEntries]:
+        """
+        -> one DayEntries per day, at most maxEventsPerDay entries each
+        """
+        days: List[DayEntries] = []
+        for bucket in self.buckets:
+            shown = heapq.nsmallest(maxEventsPerDay, bucket, key=lambda item: item[:3])
+            days.append(DayEntries((item[3] for item in shown), len(bucket) - len(shown)))
+        return days
+
+
+def get_cal_list(events: Iterable[InkalEvent], tasks: Iterable[InkalTask], startDate: dt.date,
+                 maxEventsPerDay: int, numDays: int = 28) -> List[DayEntries]:
+    """
+    Sorts events and tasks into the numDays days of the calendar
+    """
+    index = CalendarIndex(startDate, numDays)
+    for event in events:
+        index.add_event(event)
+    for task in tasks:
+        index.add_task(task)
+    return index.get_days(maxEventsPerDay)
+
+
+def get_overflow(entries: List[InkalEvent | InkalTask], maxEventsPerDay: int) -> int:
+    """
+    Number of entries of a day that are not shown, for DayEntries and plain lists
+    """
+    return getattr(entries, 'overflow', 0) + max(len(entries) - maxEventsPerDay, 0)
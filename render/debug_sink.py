@@ -0,0 +1,43 @@
+import logging
+import os
+import threading
+from typing import Dict, List
+
+from PIL import Image
+
+
+class DebugImageSink:
+    """
+    Writes rendered images to disk for debugging.
+    Saving happens on a background thread so PNG encoding stays off the render -> display path.
+    """
+
+    def __init__(self, directory: str):
+        self.logger = logging.getLogger('maginkcal')
+        self.directory = directory
+        self.threads: List[threading.Thread] = []
+
+    def submit(self, images: Dict[str, Image.Image]) -> None:
+        """
+        Queues images for saving, keyed by file name
+        """
+        thread = threading.Thread(target=self.write, args=(images,), name='debug-image-sink')
+        thread.start()
+        self.threads.append(thread)
+
+    def write(self, images: Dict[str, Image.Image]) -> None:
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for file_name, image in images.items():
+                image.save(os.path.join(self.directory, file_name))
+            self.logger.info(f'Debug images written to {self.directory}.')
+        except OSError as e:
+            self.logger.error(f'Failed to write debug images: {e}')
+
+    def flush(self) -> None:
+        """
+        Waits until all queued images are written
+        """
+        for thread in self.threads:
+            thread.join()
+        self.threads.clear()
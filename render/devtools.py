@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keeps a headless Chromium alive between renders and drives it over the DevTools protocol.
+
+The browser is started once with a local remote debugging port and detached from the calling process, so later
+runs (or a long running daemon) only push the new calendar page and capture a screenshot. The websocket client
+is deliberately minimal: text frames, no extensions, client to server masking only.
+"""
+
+import base64
+import json
+import logging
+import os
+import pathlib
+import signal
+import socket
+import struct
+import subprocess
+import time
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+
+class DevToolsError(Exception):
+    """
+    Raised when the browser session can not be reached or a DevTools call fails
+    """
+
+
+class DevToolsConnection:
+    """
+    Websocket connection to a single DevTools target
+    """
+
+    def __init__(self, ws_url: str, timeout: float):
+        url = urllib.parse.urlparse(ws_url)
+        self.next_id = 0
+        self.events: List[Dict[str, Any]] = []
+        try:
+            self.sock = socket.create_connection((url.hostname, url.port), timeout=timeout)
+            self.handshake(url.hostname, url.port, url.path)
+        except OSError as e:
+            raise DevToolsError(f'Could not connect to {ws_url}: {e}') from e
+
+    def handshake(self, host: str, port: int, path: str) -> None:
+        key = base64.b64encode(os.urandom(16)).decode()
+        request = (
+            f'GET {path} HTTP/1.1\r\n'
+            f'Host: {host}:{port}\r\n'
+            'Upgrade: websocket\r\n'
+            'Connection: Upgrade\r\n'
+            f'Sec-WebSocket-Key: {key}\r\n'
+            'Sec-WebSocket-Version: 13\r\n'
+            '\r\n'
+        )
+        self.sock.sendall(request.encode())
+        response = b''
+        while b'\r\n\r\n' not in response:
+            chunk = self.sock.recv(1024)
+            if not chunk:
+                raise DevToolsError('Connection closed during websocket handshake')
+            response += chunk
+        status_line = response.split(b'\r\n', 1)[0]
+        if b' 101 ' not in status_line:
+            raise DevToolsError(f'Websocket handshake failed: {status_line.decode(errors="replace")}')
+
+    def call(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Sends a DevTools command and waits for its result, buffering events that arrive in between
+        """
+        self.next_id += 1
+        call_id = self.next_id
+        self.send_text(json.dumps({'id': call_id, 'method': method, 'params': params or {}}))
+        while True:
+            message = self.recv_message()
+            if message.get('id') == call_id:
+                if 'error' in message:
+                    raise DevToolsError(f'{method} failed: {message["error"]}')
+                return message.get('result', {})
+            if 'method' in message:
+                self.events.append(message)
+
+    def wait_for(self, event: str) -> Dict[str, Any]:
+        """
+        Waits for a DevTools event, including ones already buffered by call()
+        """
+        for message in self.events:
+            if message['method'] == event:
+                self.events.remove(message)
+                return message.get('params', {})
+        while True:
+            message = self.recv_message()
+            if message.get('method') == event:
+                return message.get('params', {})
+
+    def recv_message(self) -> Dict[str, Any]:
+        # A garbled frame fails the session like a dropped connection, so the caller restarts or falls back
+        try:
+            message = json.loads(self.recv_text())
+        except ValueError as e:
+            raise DevToolsError(f'Malformed DevTools message: {e}') from e
+        if not isinstance(message, dict):
+            raise DevToolsError(f'Malformed DevTools message: {message!r:.80}')
+        return message
+
+    def send_text(self, text: str) -> None:
+        self.send_frame(0x1, text.encode())
+
+    def send_frame(self, opcode: int, payload: bytes) -> None:
+        header = bytes([0x80 | opcode])
+        length = len(payload)
+        if length < 126:
+            header += bytes([0x80 | length])
+        elif length < (1 << 16):
+            header += bytes([0x80 | 126]) + struct.pack('!H', length)
+        else:
+            header += bytes([0x80 | 127]) + struct.pack('!Q', length)
+        mask = os.urandom(4)
+        masked = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+        try:
+            self.sock.sendall(header + mask + masked)
+        except OSError as e:
+            raise DevToolsError(f'Websocket send failed: {e}') from e
+
+    def recv_text(self) -> str:
+        message = b''
+        while True:
+            first, second = self.recv_exact(2)
+            fin = first & 0x80
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length = struct.unpack('!H', self.recv_exact(2))[0]
+            elif length == 127:
+                length = struct.unpack('!Q', self.recv_exact(8))[0]
+            if second & 0x80:
+                mask = self.recv_exact(4)
+                payload = bytes(b ^ mask[i % 4] for i, b in enumerate(self.recv_exact(length)))
+            else:
+                payload = self.recv_exact(length)
+
+            if opcode == 0x8:
+                raise DevToolsError('Browser closed the websocket')
+            if opcode == 0x9:
+                self.send_frame(0xA, payload)
+                continue
+            if opcode == 0xA:
+                continue
+
+            message += payload
+            if fin:
+                return message.decode()
+
+    def recv_exact(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            try:
+                chunk = self.sock.recv(size - len(data))
+            except OSError as e:
+                raise DevToolsError(f'Websocket receive failed: {e}') from e
+            if not chunk:
+                raise DevToolsError('Browser closed the connection')
+            data += chunk
+        return bytes(data)
+
+    def close(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class ChromeSession:
+    """
+    Persistent headless Chromium that outlives a single render
+    """
+
+    def __init__(self, width: int, height: int, port: int = 9222, timeout: float = 30.0):
+        self.logger = logging.getLogger('maginkcal')
+        self.width = width
+        self.height = height
+        self.port = port
+        self.timeout = timeout
+        self.profile_dir = str(pathlib.Path.home() / '.cache' / 'inkal' / 'chromium')
+        self.pid_file = os.path.join(self.profile_dir, 'inkal.pid')
+
+    def screenshot(self, htmlFile: str) -> bytes:
+        """
+        Loads the calendar page in the running browser and returns the screenshot as PNG bytes.
+        Restarts the browser once if it crashed or stopped responding.
+        """
+        try:
+            return self.capture(htmlFile)
+        except DevToolsError as e:
+            self.logger.warning(f'Browser session failed ({e}), restarting browser.')
+            self.stop()
+            return self.capture(htmlFile)
+
+    def capture(self, htmlFile: str) -> bytes:
+        self.start()
+        connection = DevToolsConnection(self.get_page_ws_url(), self.timeout)
+        try:
+            connection.call('Page.enable')
+            connection.call('Emulation.setDeviceMetricsOverride', {
+                'width': self.width,
+                'height': self.height,
+                'deviceScaleFactor': 1,
+                'mobile': False,
+            })
+            connection.call('Page.navigate', {'url': htmlFile})
+            connection.wait_for('Page.loadEventFired')
+            result = connection.call('Page.captureScreenshot', {'format': 'png'})
+            if 'data' not in result:
+                raise DevToolsError('Page.captureScreenshot returned no image data')
+            try:
+                return base64.b64decode(result['data'], validate=True)
+            except ValueError as e:
+                raise DevToolsError(f'Page.captureScreenshot returned malformed image data: {e}') from e
+        finally:
+            connection.close()
+
+    def start(self) -> None:
+        """
+        Starts the browser unless it is already listening on the debugging port
+        """
+        if self.is_running():
+            return
+
+        self.logger.info(f'Starting persistent browser on port {self.port}.')
+        os.makedirs(self.profile_dir, exist_ok=True)
+        process = subprocess.Popen([
+            'chromium-browser',
+            '--headless',
+            '--disable-gpu',
+            '--hide-scrollbars',
+            '--force-device-scale-factor=1',
+            f'--window-size={self.width},{self.height}',
+            f'--remote-debugging-port={self.port}',
+            f'--user-data-dir={self.profile_dir}',
+            'about:blank',
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        with open(self.pid_file, 'w') as file:
+            file.write(str(process.pid))
+
+        deadline = time.monotonic() + self.timeout
+        while not self.is_running():
+            if process.poll() is not None:
+                raise DevToolsError(f'Browser exited with code {process.returncode}')
+            if time.monotonic() > deadline:
+                raise DevToolsError('Browser did not open its debugging port in time')
+            time.sleep(0.2)
+
+    def stop(self) -> None:
+        """
+        Closes the browser, killing it when it no longer answers
+        """
+        try:
+            version = self.get_json('/json/version')
+            connection = DevToolsConnection(version['webSocketDebuggerUrl'], self.timeout)
+            try:
+                connection.call('Browser.close')
+            finally:
+                connection.close()
+        except (DevToolsError, KeyError):
+            self.kill()
+
+        if os.path.exists(self.pid_file):
+            os.remove(self.pid_file)
+
+    def kill(self) -> None:
+        if not os.path.exists(self.pid_file):
+            return
+        try:
+            with open(self.pid_file) as file:
+                pid = int(file.read().strip() or 0)
+        except (OSError, ValueError):
+            pid = 0
+        # After a reboot or crash the pid may belong to an unrelated process group
+        if pid and self.is_own_browser(pid):
+            try:
+                os.killpg(pid, signal.SIGKILL)
+                return
+            except ProcessLookupError:
+                pass
+        self.logger.info(f'Removing stale browser pid file {self.pid_file}.')
+        os.remove(self.pid_file)
+
+    def is_own_browser(self, pid: int) -> bool:
+        """
+        Whether pid is the browser started with this session's profile directory
+        """
+        try:
+            with open(f'/proc/{pid}/cmdline', 'rb') as file:
+                arguments = file.read().split(b'\0')
+        except OSError:
+            return False
+        return f'--user-data-dir={self.profile_dir}'.encode() in arguments
+
+    def is_running(self) -> bool:
+        try:
+            self.get_json('/json/version')
+            return True
+        except DevToolsError:
+            return False
+
+    def get_page_ws_url(self) -> str:
+        for target in self.get_json('/json/list'):
+            if target.get('type') == 'page':
+                return target['webSocketDebuggerUrl']
+        target = self.get_json('/json/new?about:blank', method='PUT')
+        return target['webSocketDebuggerUrl']
+
+    def get_json(self, path: str, method: str = 'GET') -> Any:
+        request = urllib.request.Request(f'http://127.0.0.1:{self.port}{path}', method=method)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except (OSError, ValueError) as e:
+            raise DevToolsError(f'DevTools endpoint {path} unavailable: {e}') from e
@@ -7,6 +7,7 @@ from htmlgenerator import LI, OL, HTMLElement, Tuple, render, DIV
 from display_data import DisplayData
 from gcal.inkal_event import InkalEvent
 from gcal.inkal_task import InkalTask
+from render.calendar_index import get_overflow
 
 BatteryText = Literal[
     'batteryHide',
@@ -70,19 +71,8 @@ class HtmlGenerator:
             currDate: dt.datetime = data['calStartDate'] + dt.timedelta(days=i)
             dayOfMonth: int = currDate.day
             today = data['today']
-            day_class: str = ""
-            
-            if currDate == today:
-                classes = 'datecircle'
-            elif currDate.month != today.month:
-                classes = "date text-muted"
-            else:
-                classes = "date"
-
-            if currDate.day < today.day and currDate.month <= today.month and currDate.year <= today.year:
-                day_class = "past"
-            elif today + dt.timedelta(days=14) <= currDate:
-                day_class = "future"
+            classes: str = self.get_date_class(currDate, today)
+            day_class: str = self.get_day_class(currDate, today)
             
             day = DIV(
                 DIV(
@@ -103,8 +93,9 @@ class HtmlGenerator:
                     entry_div = self.get_task_html(task, currDate, today)
                 day.append(entry_div)
             
-            if len(cal_list[i]) > maxEventsPerDay:
-                more_events_div = DIV(str(len(cal_list[i]) - maxEventsPerDay) + ' more', _class="event text-muted")
+            overflow = get_overflow(cal_list[i], maxEventsPerDay)
+            if overflow:
+                more_events_div = DIV(str(overflow) + ' more', _class="event text-muted")
                 day.append(more_events_div)
             
             cal_events_elements.append(day)
@@ -116,13 +107,42 @@ class HtmlGenerator:
         
         return days
     
+    def get_date_class(self, currDate: dt.datetime, today: dt.datetime) -> str:
+        """
+        CSS classes of the day of month label
+        """
+        if currDate == today:
+            return 'datecircle'
+        elif currDate.month != today.month:
+            return "date text-muted"
+        return "date"
+
+    def get_day_class(self, currDate: dt.datetime, today: dt.datetime) -> str:
+        """
+        'past' days are hidden, 'future' days are greyed out
+        """
+        if currDate.day < today.day and currDate.month <= today.month and currDate.year <= today.year:
+            return "past"
+        elif today + dt.timedelta(days=14) <= currDate:
+            return "future"
+        return ""
+
+    def get_highlight_class(self, entry: InkalEvent | InkalTask, currDate: dt.datetime, today: dt.datetime) -> str:
+        """
+        Recently updated entries are highlighted, entries outside the current month are muted
+        """
+        if entry['isUpdated']:
+            return 'text-danger'
+        elif currDate.month != today.month:
+            return 'text-muted'
+        return ''
+
     def get_event_html(self, event: InkalEvent, currDate: dt.datetime, today: dt.datetime) -> HTMLElement:
         event_classes = ['event']
 
-        if event['isUpdated']:
-            event_classes.append('text-danger')
-        elif currDate.month != today.month:
-            event_classes.append('text-muted')
+        highlight_class = self.get_highlight_class(event, currDate, today)
+        if highlight_class:
+            event_classes.append(highlight_class)
         
         # Multiday events
         if event['isMultiday']:
@@ -159,10 +179,9 @@ class HtmlGenerator:
     def get_task_html(self, task: InkalTask, currDate: dt.datetime, today: dt.datetime) -> HTMLElement:
         task_classes = ['task']
 
-        if task['isUpdated']:
-            task_classes.append('text-danger')
-        elif currDate.month != today.month:
-            task_classes.append('text-muted')
+        highlight_class = self.get_highlight_class(task, currDate, today)
+        if highlight_class:
+            task_classes.append(highlight_class)
 
         prefix = None
         if task['isCompleted']:
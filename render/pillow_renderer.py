@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Browser free renderer that draws the calendar grid straight onto the black and red planes with Pillow.
+
+The layout mirrors HtmlGenerator.get_grid_html and styles.css: a 7 column grid with a weekday header, day cells
+with a date label (red circle for today) followed by events and tasks, and the three grey divider lines.
+Pixel values follow the colour separation of the browser path: the black plane holds black and grey content,
+the red plane holds red content as black pixels.
+"""
+
+import datetime as dt
+import pathlib
+from functools import lru_cache
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from display_data import DisplayData
+from gcal.inkal_event import InkalEvent
+from gcal.inkal_task import InkalTask
+from render.calendar_index import get_overflow
+from render.html_generator import HtmlGenerator
+
+FONT_DIR = pathlib.Path(__file__).parent.absolute()
+REGULAR = 'Quattrocento-Regular.ttf'
+BOLD = 'Quattrocento-Bold.ttf'
+
+# styles.css, in pixels (1rem = 16px, line-height 1.5)
+PADDING = 16
+GAP = 8
+LINE_HEIGHT = 1.5
+TEXT_SIZE = 16
+MINUTE_SIZE = 12
+WEEKDAY_SIZE = 40
+WEEKDAY_MARGIN = 25
+DATE_SIZE = 48
+CIRCLE_SIZE = 64
+PREFIX_WIDTH = 32
+PREFIX_MARGIN = 8
+CELL_MIN_HEIGHT = 150
+DIVIDER_TOP = 75
+
+# Black plane grey levels
+BLACK = 0
+GREY = 127
+DIVIDER_GREY = 128
+WHITE = 255
+
+
+@lru_cache(maxsize=None)
+def get_font(name: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(str(FONT_DIR / name), size)
+
+
+@lru_cache(maxsize=4096)
+def text_width(name: str, size: int, text: str) -> float:
+    """
+    Cached advance width, day cells repeat the same words and numbers on every render
+    """
+    return get_font(name, size).getlength(text)
+
+
+class PillowRenderer:
+    """
+    Draws the calendar layout with ImageDraw, skipping HTML, browser and colour separation
+    """
+
+    def __init__(self, width: int, height: int):
+        self.imageWidth = width
+        self.imageHeight = height
+        self.html_generator = HtmlGenerator()
+
+    def render(self, cal_list: List[List[InkalEvent | InkalTask]], data: DisplayData) -> Tuple[Image.Image, Image.Image]:
+        """
+        Returns [black, red] images
+        """
+        # Grey text is dithered when the black plane is reduced to 1 bit, like the browser screenshot
+        black = Image.new('L', (self.imageWidth, self.imageHeight), WHITE)
+        red = Image.new('1', (self.imageWidth, self.imageHeight), 1)
+        self.black_draw = ImageDraw.Draw(black)
+        self.red_draw = ImageDraw.Draw(red)
+
+        grid_width = self.imageWidth - 2 * PADDING
+        column_width = (grid_width - 6 * GAP) / 7
+
+        y = PADDING + self.draw_week_days(PADDING, column_width) + GAP
+        today = data['today']
+        maxEventsPerDay: int = data['maxEventsPerDay']
+
+        for week in range(len(cal_list) // 7):
+            row_height = CELL_MIN_HEIGHT
+            for weekday in range(7):
+                i = week * 7 + weekday
+                x = PADDING + weekday * (column_width + GAP)
+                currDate = data['calStartDate'] + dt.timedelta(days=i)
+                cell_height = self.draw_day(x, y, column_width, cal_list[i], currDate, today, maxEventsPerDay)
+                row_height = max(row_height, cell_height)
+            y += row_height + GAP
+
+        grid_height = y - GAP - PADDING
+        self.draw_dividers(grid_width, grid_height)
+
+        return black.convert('1'), red
+
+    def draw_week_days(self, y: float, column_width: float) -> float:
+        """
+        First row, displaying the days of the week
+        """
+        dayOfWeekText: List[str] = ['Mo', 'Di', 'Mi', 'Do', 'Fr', 'Sa', 'So']
+        line_height = WEEKDAY_SIZE * LINE_HEIGHT
+        for i in range(7):
+            x = PADDING + i * (column_width + GAP)
+            self.draw_text(self.black_draw, x + column_width / 2, y, line_height, dayOfWeekText[i],
+                           REGULAR, WEEKDAY_SIZE, BLACK, anchor='mm')
+        return line_height + WEEKDAY_MARGIN
+
+    def draw_day(self, x: float, y: float, width: float, entries: List[InkalEvent | InkalTask],
+                 currDate: dt.date, today: dt.date, maxEventsPerDay: int) -> float:
+        """
+        Draws one grid cell and returns its height
+        """
+        day_class = self.html_generator.get_day_class(currDate, today)
+        if day_class == 'past':
+            return CELL_MIN_HEIGHT
+        is_future = day_class == 'future'
+
+        top = y
+        date_class = self.html_generator.get_date_class(currDate, today)
+        if date_class == 'datecircle':
+            left = x + (width - CIRCLE_SIZE) / 2
+            self.red_draw.ellipse((left, y, left + CIRCLE_SIZE - 1, y + CIRCLE_SIZE - 1), fill=0)
+            self.draw_text(self.red_draw, x + width / 2, y, CIRCLE_SIZE, str(currDate.day),
+                           REGULAR, DATE_SIZE, 1, anchor='mm')
+            y += CIRCLE_SIZE
+        else:
+            muted = is_future or 'text-muted' in date_class
+            self.draw_text(self.black_draw, x + width / 2, y, DATE_SIZE * LINE_HEIGHT, str(currDate.day),
+                           REGULAR if is_future else BOLD, DATE_SIZE, GREY if muted else BLACK, anchor='mm')
+            y += DATE_SIZE * LINE_HEIGHT
+
+        for entry in entries[:maxEventsPerDay]:
+            y += self.draw_entry(x, y, width, entry, currDate, today, is_future)
+
+        overflow = get_overflow(entries, maxEventsPerDay)
+        if overflow:
+            more_text = str(overflow) + ' more'
+            self.draw_text(self.black_draw, x, y, TEXT_SIZE * LINE_HEIGHT, more_text, REGULAR, TEXT_SIZE, GREY)
+            y += TEXT_SIZE * LINE_HEIGHT
+
+        return max(CELL_MIN_HEIGHT, y - top)
+
+    def draw_entry(self, x: float, y: float, width: float, entry: InkalEvent | InkalTask,
+                   currDate: dt.date, today: dt.date, is_future: bool) -> float:
+        """
+        Draws an event or task row (prefix column plus wrapped text) and returns its height
+        """
+        # styles.css has no rule for text-danger, the browser renders it in the inherited colour
+        highlight_class = self.html_generator.get_highlight_class(entry, currDate, today)
+        fill = GREY if is_future or highlight_class == 'text-muted' else BLACK
+        line_height = TEXT_SIZE * LINE_HEIGHT
+
+        if entry['kind'] == 'tasks#task':
+            prefix_width = PREFIX_WIDTH
+            if entry['isCompleted']:
+                self.draw_check(x, y, line_height, fill)
+            else:
+                self.draw_tool(x, y, line_height, fill)
+            text = entry['title']
+        elif entry['isMultiday'] or entry['allday']:
+            prefix_width = PREFIX_WIDTH
+            if entry['isMultiday']:
+                self.draw_arrow(x, y, line_height, fill, entry['startDatetime'].date() == currDate)
+            text = entry['summary']
+        else:
+            prefix_width = self.draw_time(x, y, entry['startDatetime'], fill)
+            text = entry['summary']
+
+        text_x = x + prefix_width + PREFIX_MARGIN
+        lines = self.wrap(text, width - prefix_width - PREFIX_MARGIN)
+        for line in lines:
+            self.draw_text(self.black_draw, text_x, y, line_height, line, REGULAR, TEXT_SIZE, fill)
+            if entry['kind'] == 'tasks#task' and entry['isCompleted']:
+                strike_y = y + line_height / 2
+                self.black_draw.line(
+                    (text_x, strike_y, text_x + text_width(REGULAR, TEXT_SIZE, line), strike_y), fill=fill)
+            y += line_height
+
+        return max(1, len(lines)) * line_height
+
+    def draw_time(self, x: float, y: float, datetimeObj: dt.datetime, fill: int) -> float:
+        """
+        Right aligned 'H MM' time column, returns the column width
+        """
+        hour = str(datetimeObj.hour)
+        minute = '{:02d}'.format(datetimeObj.minute)
+        hour_width = text_width(REGULAR, TEXT_SIZE, hour)
+        minute_width = text_width(REGULAR, MINUTE_SIZE, minute)
+        column_width = max(PREFIX_WIDTH, hour_width + minute_width)
+        left = x + column_width - hour_width - minute_width
+        self.draw_text(self.black_draw, left, y, TEXT_SIZE * LINE_HEIGHT, hour, REGULAR, TEXT_SIZE, fill)
+        self.draw_text(self.black_draw, left + hour_width, y, MINUTE_SIZE * LINE_HEIGHT, minute,
+                       REGULAR, MINUTE_SIZE, fill)
+        return column_width
+
+    def draw_arrow(self, x: float, y: float, line_height: float, fill: int, is_start: bool) -> None:
+        """
+        '►' on the first day of a multiday event, '◄' on its last day
+        """
+        middle = y + line_height / 2
+        size = TEXT_SIZE / 2
+        if is_start:
+            points = [(x + 2, middle - size / 2), (x + 2 + size, middle), (x + 2, middle + size / 2)]
+        else:
+            points = [(x + 2 + size, middle - size / 2), (x + 2, middle), (x + 2 + size, middle + size / 2)]
+        self.black_draw.polygon(points, fill=fill)
+
+    def draw_check(self, x: float, y: float, line_height: float, fill: int) -> None:
+        """
+        '✓' prefix of completed tasks
+        """
+        middle = y + line_height / 2
+        self.black_draw.line([(x + 2, middle), (x + 5, middle + 4), (x + 12, middle - 5)], fill=fill, width=2)
+
+    def draw_tool(self, x: float, y: float, line_height: float, fill: int) -> None:
+        """
+        Stand-in for the '🛠' prefix of open tasks, which Quattrocento has no glyph for
+        """
+        middle = y + line_height / 2
+        self.black_draw.line([(x + 3, middle + 5), (x + 11, middle - 3)], fill=fill, width=2)
+        self.black_draw.ellipse((x + 9, middle - 7, x + 15, middle - 1), outline=fill, width=2)
+
+    def draw_dividers(self, grid_width: float, grid_height: float) -> None:
+        top = PADDING + DIVIDER_TOP
+        left = PADDING + grid_width * 0.02
+        self.black_draw.line((left, top, left + grid_width * 0.96 - 1, top), fill=DIVIDER_GREY)
+        for ratio in (0.28, 0.71):
+            x = PADDING + grid_width * ratio
+            self.black_draw.line((x, top, x, top + grid_height * 0.8 - 1), fill=DIVIDER_GREY)
+
+    def draw_text(self, draw: ImageDraw.ImageDraw, x: float, y: float, line_height: float, text: str,
+                  font_name: str, size: int, fill: int, anchor: str = 'lm') -> None:
+        """
+        Draws text vertically centred in a CSS line box starting at y
+        """
+        draw.text((x, y + line_height / 2), text, font=get_font(font_name, size), fill=fill, anchor=anchor)
+
+    def wrap(self, text: str, max_width: float) -> List[str]:
+        """
+        Word wraps text to max_width, breaking words that do not fit a line on their own (word-break: break-word)
+        """
+        lines: List[str] = []
+        line = ''
+        for word in text.split():
+            candidate = word if not line else line + ' ' + word
+            if text_width(REGULAR, TEXT_SIZE, candidate) <= max_width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            line = ''
+            for char in word:
+                if line and text_width(REGULAR, TEXT_SIZE, line + char) > max_width:
+                    lines.append(line)
+                    line = ''
+                line += char
+        if line:
+            lines.append(line)
+        return lines
@@ -11,14 +11,16 @@ calendar and refreshing of the eInk display. In the future, I might choose to ge
 RPi device, while using a ESP32 or PiZero purely to just retrieve the image from a file host and update the screen.
 """
 
+import io
 import os
+import tempfile
 import time
+import numpy as np
 import PIL
 from PIL.Image import Image
 import subprocess
-from typing import List, Tuple
+from typing import List, Literal, Optional, Tuple
 
-import datetime as dt
 import logging
 import pathlib
 import calendar
@@ -27,48 +29,106 @@ from PIL import Image
 from display_data import DisplayData
 from gcal.inkal_event import InkalEvent
 from gcal.inkal_task import InkalTask
+from render import calendar_index
+from render.debug_sink import DebugImageSink
+from render.devtools import ChromeSession, DevToolsError
 from render.html_generator import HtmlGenerator
+from render.pillow_renderer import PillowRenderer
+from render.render_cache import RenderCache, digest, file_digest
+
+# Memory backed scratch directory for the browser screenshot, keeps the PNG off the SD card
+SCRATCH_DIR = '/dev/shm'
+
+# 'browser' screenshots the HTML calendar, 'pillow' draws the same layout natively
+RenderBackend = Literal['browser', 'pillow']
 
 
 class ChromeRenderer:
 
-    def __init__(self, width: int, height: int, angle: int):
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        angle: int,
+        debugImageDir: Optional[str] = None,
+        persistentBrowser: bool = False,
+        renderBackend: RenderBackend = 'browser',
+        render_cache: Optional[RenderCache] = None,
+    ):
         self.logger = logging.getLogger('maginkcal')
         self.currPath = str(pathlib.Path(__file__).parent.absolute())
         self.imageWidth = width
         self.imageHeight = height
         self.rotateAngle = angle
         self.html_generator = HtmlGenerator()
+        self.debug_sink = DebugImageSink(debugImageDir) if debugImageDir else None
+        self.browser_session = ChromeSession(width, height) if persistentBrowser else None
+        self.renderBackend = renderBackend
+        self.pillow_renderer = PillowRenderer(width, height)
+        self.render_cache = render_cache
 
     
     def render(self, data: DisplayData) -> Tuple[Image, Image]:
         """
-        Writes calendar.png and extracts [black, red] images
+        Renders the calendar and returns the [black, red] images in memory
         """
 
         print(data['events'])
         print(data['tasks'])
 
-        # first setup list to represent the 4 weeks in our calendar
-        cal_list: List[List[InkalEvent | InkalTask]] = []
-        for _ in range(28):
-            cal_list.append([])
-
-        # for each item in the eventList, add them to the relevant day in our calendar list
-        for event in data['events']:
-            idx = self.get_day_in_cal(data['calStartDate'], event['startDatetime'].date())
-            if idx >= 0 and idx < len(cal_list):
-                cal_list[idx].append(event)
-            if event['isMultiday']:
-                idx = self.get_day_in_cal(data['calStartDate'], event['endDatetime'].date())
-                if idx < len(cal_list):
-                    cal_list[idx].append(event)
-
-        for task in data['tasks']:
-            idx = self.get_day_in_cal(data['calStartDate'], task['due'])
-            if idx >= 0 and idx < len(cal_list):
-                cal_list[idx].append(task)
+        data_key = None
+        if self.render_cache:
+            # Level 1 stores the HTML with the template applied, so the template and the day placement are part of
+            # the key as well as the generator
+            data_key = self.render_cache.get_data_key(
+                data,
+                self.imageWidth,
+                self.imageHeight,
+                file_digest(self.currPath + '/html_generator.py'),
+                file_digest(self.currPath + '/calendar_template.html'),
+                file_digest(self.currPath + '/calendar_index.py'),
+            )
+
+        if self.renderBackend == 'pillow':
+            planes_key = data_key and digest(data_key, file_digest(self.currPath + '/pillow_renderer.py'))
+            cached_planes = self.get_cached_planes(planes_key)
+            if cached_planes:
+                return cached_planes
+            black_image, red_image = self.get_native_images(self.get_cal_list(data), data)
+            if self.render_cache:
+                self.render_cache.put_planes(planes_key, black_image, red_image)
+            return black_image, red_image
+
+        html = self.render_cache.get_html(data_key) if self.render_cache else None
+        if html is None:
+            html = self.get_calendar_html(self.get_cal_list(data), data)
+            if self.render_cache:
+                self.render_cache.put_html(data_key, html)
+
+        planes_key = data_key and digest(
+            html,
+            file_digest(self.currPath + '/calendar_template.html'),
+            file_digest(self.currPath + '/styles.css'),
+        )
+        cached_planes = self.get_cached_planes(planes_key)
+        if cached_planes:
+            return cached_planes
+
+        htmlFile = open(self.currPath + '/calendar.html', "w")
+        htmlFile.write(html)
+        htmlFile.close()
+        htmlFileUri = 'file://' + self.currPath + '/calendar.html'
+
+        black_image, red_image = self.get_black_red_images(htmlFileUri)
+        if self.render_cache:
+            self.render_cache.put_planes(planes_key, black_image, red_image)
 
+        return black_image, red_image
+
+    def get_calendar_html(self, cal_list: List[List[InkalEvent | InkalTask]], data: DisplayData) -> str:
+        """
+        Fills the calendar template with the generated grid
+        """
         # Read html template
         with open(self.currPath + '/calendar_template.html', 'r') as file:
             calendar_template = file.read()
@@ -78,69 +138,117 @@ class ChromeRenderer:
 
 
         grid = self.html_generator.get_grid_html(cal_list, data)
-                    
-        htmlFile = open(self.currPath + '/calendar.html', "w")
-        htmlFile.write(calendar_template.format(
+
+        return calendar_template.format(
             month=month_name,
             grid=grid,
             # time=dt.datetime.now().strftime('%H:%M')
-        ))
-        htmlFile.close()
-        htmlFileUri = 'file://' + self.currPath + '/calendar.html'
+        )
 
-        black_image, red_image = self.get_black_red_images(htmlFileUri)
+    def get_cached_planes(self, planes_key: Optional[str]) -> Optional[Tuple[Image, Image]]:
+        if not planes_key:
+            return None
+        cached_planes = self.render_cache.get_planes(planes_key, (self.imageWidth, self.imageHeight))
+        if cached_planes:
+            self.logger.info('Render cache hit, reusing black and red images.')
+        return cached_planes
+
+    def get_cal_list(self, data: DisplayData) -> List[List[InkalEvent | InkalTask]]:
+        """
+        Sorts events and tasks into the 28 days of the calendar, see render/calendar_index.py
+        """
+        return calendar_index.get_cal_list(
+            data['events'], data['tasks'], data['calStartDate'], data['maxEventsPerDay']
+        )
+
+    def get_native_images(self, cal_list: List[List[InkalEvent | InkalTask]], data: DisplayData) -> Tuple[Image, Image]:
+        """
+        Draws the [black, red] images with Pillow, no browser or colour separation involved
+        """
+        start = time.perf_counter()
+        black_img, red_img = self.pillow_renderer.render(cal_list, data)
+        end = time.perf_counter()
+        self.logger.info(f'Drew calendar natively in {end - start:0.4f} seconds.')
+
+        if self.debug_sink:
+            self.debug_sink.submit({
+                'red_image.png': red_img,
+                'black_image.png': black_img,
+            })
+        return black_img, red_img
 
-        return black_image, red_image
-    
     def get_black_red_images(self, htmlFile: str) -> Tuple[Image, Image]:
         """This function captures a screenshot of the calendar,
         processes the image to extract the grayscale and red"""
 
-        # png_path = self.chrome_render_calendar_png(htmlFile)
-        png_path = self.firefox_render_calendar_png(htmlFile)
-
-        self.logger.info('Screenshot captured and saved to file.')
+        png_bytes = self.capture_screenshot(htmlFile)
 
-        red_img = PIL.Image.open(png_path)
-        red_pixels = red_img.load()
-        black_img = PIL.Image.open(png_path)
-        black_pixels = black_img.load()
+        self.logger.info('Screenshot captured.')
 
-        # Loop through every pixel in the image
         start = time.perf_counter()
-        for i in range(red_img.size[0]):  # loop through every pixel in the image
-            for j in range(red_img.size[1]): # since both bitmaps are identical, cycle only once and not both bitmaps
-                red_value = red_pixels[i, j][0]
-                green_value = red_pixels[i, j][1]
-                blue_value = red_pixels[i, j][2]
-
-                if red_value <= green_value and red_value <= blue_value:  # if is not red
-                    red_pixels[i, j] = (255, 255, 255)  # change it to white in the red image bitmap
-
-                    red_value = black_pixels[i, j][0]
-                    green_value = black_pixels[i, j][1]
-                    blue_value = black_pixels[i, j][2]
-
-                elif red_value > green_value and red_value > blue_value:  # if is red
-                    black_pixels[i, j] = (255, 255, 255)  # change to white in the black image bitmap
+        screenshot = PIL.Image.open(io.BytesIO(png_bytes))
+        black_img, red_img = self.separate_black_red(screenshot)
 
         end = time.perf_counter()
         self.logger.info(f'Processed image in {end - start:0.4f} seconds.')
-        # red_img: Image = red_img.rotate(self.rotateAngle, expand=True)
-        # black_img: Image = black_img.rotate(self.rotateAngle, expand=True)
-
-        # Extract directory from png_path
-        directory = os.path.dirname(png_path)
+        # rotateAngle is applied while packing the planes for the panel, see epd_buffer.get_panel_rotation
 
-        # Save images next to the original png_path
-        red_img.save(os.path.join(directory, 'red_image.png'))
-        black_img.save(os.path.join(directory, 'black_image.png'))
+        if self.debug_sink:
+            self.debug_sink.submit({
+                'calendar.png': screenshot,
+                'red_image.png': red_img,
+                'black_image.png': black_img,
+            })
 
         self.logger.info('Image colours processed. Extracted grayscale and red images.')
         return black_img, red_img
+
+    def capture_screenshot(self, htmlFile: str) -> bytes:
+        """
+        Screenshots the calendar and returns the PNG bytes.
+        Uses the persistent browser session when enabled, falling back to a one-shot browser.
+        """
+        if self.browser_session:
+            try:
+                return self.browser_session.screenshot(htmlFile)
+            except (DevToolsError, OSError) as e:
+                self.logger.warning(f'Persistent browser unavailable ({e}), using one-shot browser.')
+
+        scratch_dir = SCRATCH_DIR if os.path.isdir(SCRATCH_DIR) else None
+        with tempfile.TemporaryDirectory(prefix='inkal-', dir=scratch_dir) as tmp_dir:
+            png_path = os.path.join(tmp_dir, 'calendar.png')
+            # self.chrome_render_calendar_png(htmlFile, png_path)
+            self.firefox_render_calendar_png(htmlFile, png_path)
+            with open(png_path, 'rb') as file:
+                return file.read()
     
-    def chrome_render_calendar_png(self, htmlFile: str) -> str:
-        png_path = self.currPath + '/calendar.png'
+    def separate_black_red(self, screenshot: Image) -> Tuple[Image, Image]:
+        """
+        Splits a screenshot into [black, red] images in a single array pass.
+        Red pixels are whitened in the black image, everything else is whitened in the red image.
+        """
+        if screenshot.mode not in ('RGB', 'RGBA'):
+            screenshot = screenshot.convert('RGB')
+
+        pixels = np.asarray(screenshot)
+        red = pixels[:, :, 0]
+        green = pixels[:, :, 1]
+        blue = pixels[:, :, 2]
+
+        is_red = (red > green) & (red > blue)
+        is_not_red = (red <= green) & (red <= blue)
+
+        black_pixels = pixels.copy()
+        black_pixels[is_red] = 255
+        red_pixels = pixels.copy()
+        red_pixels[is_not_red] = 255
+
+        black_img = PIL.Image.fromarray(black_pixels)
+        red_img = PIL.Image.fromarray(red_pixels)
+        return black_img, red_img
+
+    def chrome_render_calendar_png(self, htmlFile: str, png_path: Optional[str] = None) -> str:
+        png_path = png_path or self.currPath + '/calendar.png'
         subprocess.run([
             'chromium-browser',
             '--headless',                   # No use for user interface
@@ -153,8 +261,8 @@ class ChromeRenderer:
         ], check=True)
         return png_path
     
-    def firefox_render_calendar_png(self, htmlFile: str) -> str:
-        png_path = self.currPath + '/calendar.png'
+    def firefox_render_calendar_png(self, htmlFile: str, png_path: Optional[str] = None) -> str:
+        png_path = png_path or self.currPath + '/calendar.png'
         subprocess.run([
             'firefox',
             '--headless',  # Run in headless mode (no GUI)
@@ -163,11 +271,3 @@ class ChromeRenderer:
             htmlFile  # Path to the HTML file
         ], check=True)
         return png_path
-
-    def get_day_in_cal(self, startDate: dt.datetime, eventDate: dt.datetime) -> int:
-        """
-        Returns the index of the day in the calendar list
-        """
-
-        delta: dt.timedelta = eventDate - startDate
-        return delta.days
@@ -0,0 +1,165 @@
+"""
+Content addressed on-disk cache for the render pipeline, two levels:
+
+html    normalised DisplayData, panel size, html_generator.py, calendar_template.html and calendar_index.py
+        -> generated HTML
+planes  HTML + calendar_template.html + styles.css (or, for the Pillow backend, the html key + pillow_renderer.py)
+        -> packed black/red planes
+
+Whether a frame needs to reach the panel at all is not decided here: EInkDisplay.display_buffers
+(display/display.py) compares the frame digest recorded in the display state file and skips frames already shown.
+"""
+
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import tempfile
+from collections.abc import Mapping, Sequence
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple
+
+from PIL import Image
+
+from display_data import DisplayData
+
+DEFAULT_CACHE_DIR = str(pathlib.Path.home() / '.cache' / 'inkal' / 'render')
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# DisplayData fields that change every run without changing the rendered frame
+VOLATILE_KEYS = ('lastRefresh',)
+
+
+@lru_cache(maxsize=None)
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def digest(*parts: Any) -> str:
+    sha = hashlib.sha256()
+    for part in parts:
+        sha.update(part if isinstance(part, bytes) else str(part).encode())
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def to_json(value: Any) -> Any:
+    if isinstance(value, (dt.datetime, dt.date, dt.time)):
+        return value.isoformat()
+    # Event/task records and their column stores (gcal/records.py), rows are tuples json would encode as lists
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, Sequence) and not isinstance(value, str):
+        return [dict(item) if isinstance(item, Mapping) else item for item in value]
+    return str(value)
+
+
+class RenderCache:
+    """
+    Content addressed cache for the render pipeline, stored on disk with size bounded LRU eviction.
+    The html and planes levels are described in the module docstring.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.logger = logging.getLogger('maginkcal')
+        self.directory = directory
+        self.max_bytes = max_bytes
+        for level in ('html', 'planes'):
+            os.makedirs(os.path.join(directory, level), exist_ok=True)
+
+    def get_data_key(self, data: DisplayData, *params: Any) -> str:
+        """
+        Hash of the DisplayData without per-run fields, plus any render parameters
+        """
+        normalized = {key: value for key, value in data.items() if key not in VOLATILE_KEYS}
+        return digest(json.dumps(normalized, sort_keys=True, default=to_json), *params)
+
+    def get_html(self, key: str) -> Optional[str]:
+        content = self.read(os.path.join('html', key + '.html'))
+        return content.decode() if content is not None else None
+
+    def put_html(self, key: str, html: str) -> None:
+        self.write(os.path.join('html', key + '.html'), html.encode())
+
+    def get_planes(self, key: str, size: Tuple[int, int]) -> Optional[Tuple[Image.Image, Image.Image]]:
+        name = os.path.join('planes', key + '.bin')
+        content = self.read(name)
+        if content is None:
+            return None
+        # Mode '1' rows are padded to whole bytes
+        plane_bytes = (size[0] + 7) // 8 * size[1]
+        try:
+            if len(content) != 2 * plane_bytes:
+                raise ValueError(f'{len(content)} bytes, expected {2 * plane_bytes} for {size[0]}x{size[1]}')
+            black = Image.frombytes('1', size, content[:plane_bytes])
+            red = Image.frombytes('1', size, content[plane_bytes:])
+        except ValueError as e:
+            # A broken entry is a miss, it must never fail the render
+            self.logger.warning(f'Dropping render cache entry {name}: {e}')
+            self.remove(name)
+            return None
+        return black, red
+
+    def put_planes(self, key: str, black: Image.Image, red: Image.Image) -> None:
+        """
+        Stores the planes as packed 1 bit data, which is exactly what the display converts them to
+        """
+        content = black.convert('1').tobytes() + red.convert('1').tobytes()
+        self.write(os.path.join('planes', key + '.bin'), content)
+
+    def read(self, name: str) -> Optional[bytes]:
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as file:
+                content = file.read()
+        except OSError:
+            return None
+        # Reads refresh the modification time, which is the LRU order for eviction
+        os.utime(path)
+        return content
+
+    def remove(self, name: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def write(self, name: str, content: bytes) -> None:
+        try:
+            self.write_atomic(os.path.join(self.directory, name), content)
+            self.evict()
+        except OSError as e:
+            self.logger.warning(f'Failed to write render cache entry {name}: {e}')
+
+    def write_atomic(self, path: str, content: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                file.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def evict(self) -> None:
+        """
+        Removes least recently used entries until the cache fits into max_bytes
+        """
+        entries: List[Tuple[float, int, str]] = []
+        for level in ('html', 'planes'):
+            level_dir = os.path.join(self.directory, level)
+            for entry in os.scandir(level_dir):
+                if entry.is_file() and not entry.name.startswith('.tmp-'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
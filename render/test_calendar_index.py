@@ -0,0 +1,48 @@
+import datetime as dt
+
+from pytz import timezone
+
+from render.calendar_index import get_cal_list
+
+tz = timezone('Europe/Berlin')
+
+
+def event(summary, start, end, allday=False):
+    return {
+        'kind': 'calendar#event',
+        'summary': summary,
+        'allday': allday,
+        'startDatetime': tz.localize(start),
+        'endDatetime': tz.localize(end),
+        'isMultiday': start.date() != end.date(),
+    }
+
+
+def test_get_cal_list() -> None:
+    """
+    Events cover every day they span, all-day entries come first and the rest is counted as overflow
+    """
+    events = [
+        event('late', dt.datetime(2026, 1, 6, 18), dt.datetime(2026, 1, 6, 19)),
+        event('trip', dt.datetime(2026, 1, 4, 9), dt.datetime(2026, 1, 8, 12)),
+        event('holiday', dt.datetime(2026, 1, 6), dt.datetime(2026, 1, 6, 23, 59, 59), allday=True),
+        event('early', dt.datetime(2026, 1, 6, 8), dt.datetime(2026, 1, 6, 9)),
+        # Apps Script all-day events end at midnight of the next day
+        event('vacation', dt.datetime(2025, 12, 20), dt.datetime(2026, 1, 3), allday=True),
+        event('outside', dt.datetime(2026, 3, 1, 8), dt.datetime(2026, 3, 1, 9)),
+    ]
+    tasks = [
+        {'kind': 'tasks#task', 'title': 'task', 'due': dt.date(2026, 1, 6)},
+        {'kind': 'tasks#task', 'title': 'undated', 'due': None},
+    ]
+    cal_list = get_cal_list(events, tasks, dt.date(2026, 1, 1), 3)
+
+    def summaries(day):
+        return [entry.get('summary', entry.get('title')) for entry in cal_list[day - 1]]
+
+    assert len(cal_list) == 28
+    assert [summaries(day) for day in (1, 2, 3)] == [['vacation'], ['vacation'], []]
+    assert [summaries(day) for day in (4, 5, 7, 8, 9)] == [['trip'], ['trip'], ['trip'], ['trip'], []]
+    assert summaries(6) == ['trip', 'holiday', 'early']
+    assert cal_list[5].overflow == 2
+    assert sum(len(day) + day.overflow for day in cal_list) == 11
@@ -0,0 +1,194 @@
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from render import devtools
+from render.devtools import ChromeSession, DevToolsConnection, DevToolsError
+
+
+def connect():
+    """
+    -> (DevToolsConnection, browser end) over a socketpair, without the handshake
+    """
+    client, server = socket.socketpair()
+    client.settimeout(5)
+    server.settimeout(5)
+    connection = DevToolsConnection.__new__(DevToolsConnection)
+    connection.sock = client
+    connection.next_id = 0
+    connection.events = []
+    return connection, server
+
+
+def server_frame(payload, opcode=0x1, fin=True):
+    # The browser does not mask its frames
+    header = bytes([(0x80 if fin else 0) | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < (1 << 16):
+        header += bytes([126]) + struct.pack('!H', len(payload))
+    else:
+        header += bytes([127]) + struct.pack('!Q', len(payload))
+    return header + payload
+
+
+def recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        assert chunk
+        data += chunk
+    return data
+
+
+def read_client_frame(sock):
+    """
+    -> (opcode, unmasked payload) of one frame sent by the client
+    """
+    first, second = recv_exact(sock, 2)
+    assert first & 0x80 and second & 0x80
+    length = second & 0x7F
+    if length == 126:
+        length = struct.unpack('!H', recv_exact(sock, 2))[0]
+    elif length == 127:
+        length = struct.unpack('!Q', recv_exact(sock, 8))[0]
+    mask = recv_exact(sock, 4)
+    payload = bytes(b ^ mask[i % 4] for i, b in enumerate(recv_exact(sock, length)))
+    return first & 0x0F, payload
+
+
+@pytest.mark.parametrize('size', [0, 125, 126, 65535, 65536])
+def test_send_frame_lengths(size):
+    """
+    Client frames are masked and use the 16 and 64 bit length fields from 126 and 65536 bytes on
+    """
+    connection, server = connect()
+    payload = bytes(i % 251 for i in range(size))
+    sender = threading.Thread(target=connection.send_frame, args=(0x1, payload))
+    sender.start()
+    extended = 0 if size < 126 else 2 if size < 65536 else 8
+    data = recv_exact(server, 2 + extended + 4 + size)
+    sender.join()
+    assert data[1] & 0x7F == (size if size < 126 else 126 if size < 65536 else 127)
+    server.close()
+
+    reader, writer = socket.socketpair()
+    writer.sendall(data)
+    assert read_client_frame(reader) == (0x1, payload)
+    connection.close()
+    reader.close()
+    writer.close()
+
+
+@pytest.mark.parametrize('size', [5, 126, 65536])
+def test_recv_text_lengths(size):
+    """
+    Server frames with 7, 16 and 64 bit lengths decode to the sent text
+    """
+    connection, server = connect()
+    text = ''.join(chr(ord('a') + i % 26) for i in range(size))
+    sender = threading.Thread(target=server.sendall, args=(server_frame(text.encode()),))
+    sender.start()
+    assert connection.recv_text() == text
+    sender.join()
+    connection.close()
+    server.close()
+
+
+def test_recv_text_fragmented():
+    """
+    Frames arriving in pieces and messages split into continuation frames are reassembled, pings are answered
+    """
+    connection, server = connect()
+    data = (server_frame(b'{"id": 1, ', fin=False) + server_frame(b'ping', opcode=0x9)
+            + server_frame(b'"result": {}}', opcode=0x0))
+
+    def send_slowly():
+        for i in range(0, len(data), 3):
+            server.sendall(data[i:i + 3])
+            time.sleep(0.001)
+
+    sender = threading.Thread(target=send_slowly)
+    sender.start()
+    assert connection.recv_text() == '{"id": 1, "result": {}}'
+    sender.join()
+    assert read_client_frame(server) == (0xA, b'ping')
+
+    # A close frame or a closed socket end the session
+    server.sendall(server_frame(b'', opcode=0x8))
+    with pytest.raises(DevToolsError):
+        connection.recv_text()
+    server.sendall(server_frame(b'truncated')[:6])
+    server.close()
+    with pytest.raises(DevToolsError):
+        connection.recv_text()
+    connection.close()
+
+
+def test_capture_without_data(monkeypatch):
+    """
+    A screenshot result without image data fails the session instead of raising KeyError
+    """
+    class FakeConnection:
+        def __init__(self, ws_url, timeout):
+            pass
+
+        def call(self, method, params=None):
+            return {}
+
+        def wait_for(self, event):
+            return {}
+
+        def close(self):
+            pass
+
+    session = ChromeSession(1304, 984)
+    monkeypatch.setattr(devtools, 'DevToolsConnection', FakeConnection)
+    monkeypatch.setattr(session, 'start', lambda: None)
+    monkeypatch.setattr(session, 'get_page_ws_url', lambda: 'ws://127.0.0.1:9222/devtools/page/1')
+    with pytest.raises(DevToolsError):
+        session.capture('file:///tmp/calendar.html')
+
+
+def test_call_malformed_message():
+    """
+    Frames that are not UTF-8 JSON objects raise DevToolsError, so the session is restarted
+    """
+    for payload in (b'{"id": 1', b'\xff\xfe', b'[1, 2]'):
+        connection, server = connect()
+        server.sendall(server_frame(payload))
+        with pytest.raises(DevToolsError):
+            connection.call('Page.enable')
+        connection.close()
+        server.close()
+
+
+def test_kill_checks_pid(tmp_path):
+    """
+    Only the browser started with the session's profile is killed, a stale pid file is removed
+    """
+    session = ChromeSession(1304, 984)
+    session.profile_dir = str(tmp_path)
+    session.pid_file = str(tmp_path / 'inkal.pid')
+
+    # The pid of an unrelated process, this one
+    (tmp_path / 'inkal.pid').write_text(str(os.getpid()))
+    session.kill()
+    assert not (tmp_path / 'inkal.pid').exists()
+
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)',
+                                f'--user-data-dir={tmp_path}'], start_new_session=True)
+    (tmp_path / 'inkal.pid').write_text(str(process.pid))
+    # Until the child has exec'd it still carries the test's command line
+    deadline = time.monotonic() + 5
+    while not session.is_own_browser(process.pid) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    session.kill()
+    assert process.wait(5) == -signal.SIGKILL
@@ -11,7 +11,6 @@ from typings_google_calendar_api.events import Event
 from render.render import ChromeRenderer
 
 
-
 def test_render_calendar() -> None:
     """
     Renders the calendar from a static file containing mock data
@@ -37,6 +36,7 @@ def test_render_calendar() -> None:
     black_image.save(os.path.join(current_dir, 'black_image.png'))
     red_image.save(os.path.join(current_dir, 'red_image.png'))
 
+
 def test_render_calendar_horizontal() -> None:
     """
     Renders the calendar from a static file containing mock data
@@ -62,10 +62,136 @@ def test_render_calendar_horizontal() -> None:
     black_image.save(os.path.join(current_dir, 'black_image.png'))
     red_image.save(os.path.join(current_dir, 'red_image.png'))
 
+
 def test_get_calendars() -> None:
     """
     Tests Google Authentication
     """
     google_calendar = GoogleCalendar()
     calendars: List[Calendar] = google_calendar.list_calendars()
-    assert len(calendars) > 0
\ No newline at end of file
+    assert len(calendars) > 0
+
+
+def test_separate_black_red() -> None:
+    """
+    Array based colour separation matches the original per-pixel loop
+    """
+    import random
+    from PIL import Image
+
+    random.seed(0)
+    screenshot = Image.new('RGB', (64, 48))
+    screenshot.putdata([
+        (random.randint(0, 255), random.randint(0, 255), random.randint(0, 255))
+        for _ in range(64 * 48)
+    ])
+
+    expected_red = screenshot.copy()
+    expected_black = screenshot.copy()
+    red_pixels = expected_red.load()
+    black_pixels = expected_black.load()
+    for i in range(64):
+        for j in range(48):
+            r, g, b = red_pixels[i, j]
+            if r <= g and r <= b:
+                red_pixels[i, j] = (255, 255, 255)
+            elif r > g and r > b:
+                black_pixels[i, j] = (255, 255, 255)
+
+    renderer = ChromeRenderer(64, 48, 0)
+    black_image, red_image = renderer.separate_black_red(screenshot)
+
+    assert black_image.tobytes() == expected_black.tobytes()
+    assert red_image.tobytes() == expected_red.tobytes()
+
+
+def test_render_calendar_native() -> None:
+    """
+    Draws the calendar with the Pillow backend from the Apps Script sample data
+    """
+    import datetime as dt
+    import json
+    from PIL import ImageOps
+    from gcal.converter import Converter
+    from render import pillow_renderer as layout
+
+    with open(Path(__file__).parent.parent / 'gcal' / 'test-events.json') as file:
+        raw = json.load(file)
+
+    today = dt.date(2026, 1, 14)
+    data: DisplayData = {
+        'calStartDate': today - dt.timedelta(days=today.weekday()),
+        'events': Converter.to_inkal_events(raw['calendars']),
+        'lastRefresh': dt.datetime(2026, 1, 14, 6, 0),
+        'maxEventsPerDay': 7,
+        'today': today,
+        'tasks': Converter.to_inkal_tasks(raw.get('tasks', [])),
+    }
+
+    renderer = ChromeRenderer(1304, 984, 0, renderBackend='pillow')
+    black_image, red_image = renderer.render(data)
+
+    assert black_image.size == red_image.size == (1304, 984)
+
+    def has_content(image, box):
+        return ImageOps.invert(image.convert('L').crop(box)).getbbox() is not None
+
+    # Cells of the first week, the grid starts below the weekday header
+    column_width = (1304 - 2 * layout.PADDING - 6 * layout.GAP) / 7
+    row_top = layout.PADDING + layout.WEEKDAY_SIZE * layout.LINE_HEIGHT + layout.WEEKDAY_MARGIN + layout.GAP
+
+    def cell(weekday, top=0):
+        left = layout.PADDING + weekday * (column_width + layout.GAP)
+        return (round(left), round(row_top + top), round(left + column_width), round(row_top + layout.CELL_MIN_HEIGHT))
+
+    # Today's date circle is the only red content
+    red_bbox = ImageOps.invert(red_image.convert('L')).getbbox()
+    today_cell = cell(today.weekday())
+    assert red_bbox is not None
+    assert today_cell[0] <= red_bbox[0] and today_cell[1] <= red_bbox[1]
+    assert red_bbox[2] <= today_cell[2] and red_bbox[3] <= today_cell[3]
+
+    # Weekday header, the multiday event on today and the next day, two events on Saturday; past days stay empty
+    assert has_content(black_image, (layout.PADDING, layout.PADDING, 1304 - layout.PADDING, layout.PADDING + layout.DIVIDER_TOP - 1))
+    assert has_content(black_image, cell(today.weekday(), layout.CIRCLE_SIZE))
+    assert has_content(black_image, cell(3, layout.DATE_SIZE * layout.LINE_HEIGHT))
+    assert has_content(black_image, cell(5, layout.DATE_SIZE * layout.LINE_HEIGHT))
+    assert not has_content(black_image, cell(0))
+
+
+def test_render_cache(tmp_path: Path) -> None:
+    """
+    Planes survive a cache round trip and old entries are evicted
+    """
+    from PIL import Image, ImageDraw
+    from render.render_cache import RenderCache
+
+    black = Image.new('1', (64, 48), 1)
+    ImageDraw.Draw(black).rectangle((4, 4, 20, 20), fill=0)
+    red = Image.new('1', (64, 48), 1)
+
+    cache = RenderCache(str(tmp_path), max_bytes=1024)
+    cache.put_planes('frame', black, red)
+    cached_black, cached_red = cache.get_planes('frame', (64, 48))
+    assert cached_black.tobytes() == black.tobytes()
+    assert cached_red.tobytes() == red.tobytes()
+
+    # Oldest entries are evicted once the cache outgrows max_bytes
+    cache.put_html('page', 'x' * 2000)
+    assert cache.get_planes('frame', (64, 48)) is None
+
+
+def test_render_cache_corrupt_planes(tmp_path: Path) -> None:
+    """
+    Truncated entries and entries of another size are misses and get removed
+    """
+    from PIL import Image
+    from render.render_cache import RenderCache
+
+    cache = RenderCache(str(tmp_path))
+    cache.put_planes('frame', Image.new('1', (64, 40), 1), Image.new('1', (64, 40), 1))
+    assert cache.get_planes('frame', (64, 48)) is None
+    assert not (tmp_path / 'planes' / 'frame.bin').exists()
+
+    cache.write('planes/short.bin', b'\xff' * 10)
+    assert cache.get_planes('short', (60, 48)) is None
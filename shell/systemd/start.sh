@@ -1,2 +1,3 @@
 sudo systemctl start maginkcal.timer
-sudo systemctl enable maginkcal.timer
\ No newline at end of file
+sudo systemctl enable maginkcal.timer
+sudo systemctl enable --now inkal-display.service
@@ -1,17 +1,14 @@
-from display.display import EInkDisplay
-from PIL import Image
-import os
+from display.display_service import DisplayClient
+from display.framebuffer import DEFAULT_FRAMEBUFFER_PATH, FrameBufferReader
 
 if __name__ == "__main__":
-    eInkDisplay = EInkDisplay(984, 1304)
-
-    # Load the images saved by render.py
-    directory = '/home/pi/inkal/render'
-    red_image_path = os.path.join(directory, 'red_image.png')
-    black_image_path = os.path.join(directory, 'black_image.png')
-
-    red_image = Image.open(red_image_path)
-    black_image = Image.open(black_image_path)
-
-    # Display the images
-    eInkDisplay.display(black_image, red_image)
\ No newline at end of file
+    # Shows the frame maginkcal.py last published in the framebuffer file
+    display_client = DisplayClient()
+    if display_client.is_available():
+        display_client.display_framebuffer(DEFAULT_FRAMEBUFFER_PATH, force=True)
+    else:
+        from display.display import EInkDisplay
+
+        eInkDisplay = EInkDisplay(984, 1304)
+        _, black_buf, red_buf = FrameBufferReader(DEFAULT_FRAMEBUFFER_PATH).read()
+        eInkDisplay.display_buffers(black_buf, red_buf, force=True)